@@ -1,52 +1,285 @@
 import asyncio
+import contextlib
+import datetime
 import os
 import time
 import typing
 from typing import Union
 
 import dotenv
-import httpx
 import pymongo
-from fastapi import FastAPI, HTTPException
+from database import Mongo
+from discord_users import DiscordUsers
+from donation_rollups import (DonationSummary, donation_summary,
+                              donation_version)
+from export import MEDIA_TYPES, WRITERS, export_query, export_row
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from live_feed import Change, DonationFeed, changes_since, sse_event
+from member_names import member_names, names_version
+from pymongo.asynchronous.database import AsyncDatabase
+from response_cache import ResponseCache, etag_matches
 
 dotenv.load_dotenv()
 
 MONGODB_DOMAIN = os.environ.get("MONGODB_DOMAIN", default="localhost")
+MONGODB_MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", default=32))
+MONGODB_MIN_POOL_SIZE = 4
 DISCORD_API_TOKEN: str | None = os.environ.get("DISCORD_API_TOKEN", None)
+MAX_DONATIONS_PER_REQUEST = 500
+EXPORT_BATCH_SIZE = 1000
+LIVE_POLL_INTERVAL = 2
+LIVE_KEEPALIVE = 15
+LIVE_QUEUE_SIZE = 256
 
-app = FastAPI()
+# Only asked for collectors whose names are neither on the donation nor in
+# member_names
+DISCORD_USERS = (
+    DiscordUsers(DISCORD_API_TOKEN, size=4096, ttl=3600, concurrency=8)
+    if DISCORD_API_TOKEN
+    else None
+)
 
-mongo: pymongo.MongoClient = pymongo.MongoClient(MONGODB_DOMAIN, 27017)
 
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> typing.AsyncIterator[None]:
+    await mongo.start()
+    yield
+    await LIVE_FEED.close()
+    await mongo.close()
+    if DISCORD_USERS:
+        await DISCORD_USERS.close()
 
-@app.get("/donations/{guild_id}/{donation_index}")
-async def read_item(guild_id: int, donation_index: int) -> str:
-    COLLECTION = mongo[str(guild_id)]["donations"]
-    donations = list(sorted(COLLECTION.find(), key=lambda d: d["_id"]))
-    if donation_index >= len(donations):
-        raise HTTPException(status_code=404, detail="Item not found")
 
-    collectors = []
-    for c in donations[donation_index]["collectors"]:
-        while "retry_after" in (
-            res := httpx.get(
-                f"https://discord.com/api/v9/users/{c}",
-                headers={"Authorization": f"Bot {DISCORD_API_TOKEN}"},
-            ).json()
-        ):
-            await asyncio.sleep(res["retry_after"])
-        collectors.append(res["username"] if "username" in res else res["id"])
+app = FastAPI(lifespan=lifespan)
 
-    return (
-        f'{donations[donation_index]["_id"].isoformat()}Z;'
-        + ", ".join(
-            f"{b['amount']} SCU of {b['commodity']}"
-            for b in donations[donation_index]["booty"]
+RESPONSE_CACHE = ResponseCache(size=1024)
+LIVE_FEED = DonationFeed(LIVE_POLL_INTERVAL, LIVE_QUEUE_SIZE)
+
+mongo = Mongo(MONGODB_DOMAIN, 27017, MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE)
+
+
+async def guild_version(db: AsyncDatabase) -> str:
+    # Responses carry collector names from member_names too
+    return f"{await donation_version(db)}-{await names_version(db)}"
+
+
+@app.get("/donations/{guild_id}/summary", response_model=DonationSummary)
+async def read_summary(request: Request, guild_id: int) -> Response:
+    db = mongo[str(guild_id)]
+    now = datetime.datetime.utcnow()
+
+    async def build() -> DonationSummary:
+        return await donation_summary(db, now)
+
+    # The windows move with the clock, at hour granularity
+    version = f"{await guild_version(db)}-{now:%Y%m%d%H}"
+    return await RESPONSE_CACHE.respond(request, guild_id, version, build)
+
+
+async def collector_names(db: AsyncDatabase, donations: list[dict]) -> dict[int, str]:
+    # Names of collectors the donations do not carry themselves
+    missing = {
+        c
+        for d in donations
+        for c, name in zip(d["collectors"], d.get("collector_names", []))
+        if name is None
+    } | {c for d in donations if "collector_names" not in d for c in d["collectors"]}
+    names = await member_names(db, list(missing)) if missing else {}
+    unknown = [c for c in missing if c not in names]
+    if unknown and DISCORD_USERS:
+        names |= await DISCORD_USERS.names(unknown)
+    return names
+
+
+def donation_collectors(donation: dict, names: dict[int, str]) -> list[str]:
+    return [
+        name or names.get(c, str(c))
+        for c, name in zip(
+            donation["collectors"],
+            donation.get("collector_names", [None] * len(donation["collectors"])),
         )
-        + f';{sum(b["profit"] for b in donations[donation_index]["booty"])}'
+    ]
+
+
+def donation_to_row(donation: dict, names: dict[int, str]) -> str:
+    collectors = donation_collectors(donation, names)
+    return (
+        f'{donation["_id"].isoformat()}Z;'
+        + ", ".join(f"{b['amount']} SCU of {b['commodity']}" for b in donation["booty"])
+        + f';{sum(b["profit"] for b in donation["booty"])}'
         + f';{", ".join(collectors) or "-"}'
-        + f';{donations[donation_index]["ship"]["name"] if "ship" in donations[donation_index] else "-"}'
-        + f';{donations[donation_index]["location"] if "location" in donations[donation_index] else "-"}'
-        + f';{donations[donation_index]["owner"] if "owner" in donations[donation_index] else "-"}'
-        + f';{donations[donation_index]["method"] if "method" in donations[donation_index] else "-"}'
+        + f';{donation["ship"]["name"] if "ship" in donation else "-"}'
+        + f';{donation["location"] if "location" in donation else "-"}'
+        + f';{donation["owner"] if "owner" in donation else "-"}'
+        + f';{donation["method"] if "method" in donation else "-"}'
+    )
+
+
+@app.get("/donations/{guild_id}", response_model=list[str])
+async def read_range(
+    request: Request,
+    guild_id: int,
+    start: int = 0,
+    limit: int = 100,
+    after: datetime.datetime | None = None,
+) -> Response:
+    # Rows in donation order, from an index or after the timestamp of the last
+    # row already fetched. "after" seeks straight to the next row in the _id
+    # index, so syncing every row in pages reads each donation once
+    if start < 0 or not 0 < limit <= MAX_DONATIONS_PER_REQUEST:
+        raise HTTPException(status_code=422, detail="Invalid range")
+    query = {"_id": {"$gt": after}} if after else {}
+    db = mongo[str(guild_id)]
+
+    async def build() -> list[str]:
+        donations = await (
+            db["donations"]
+            .find(query)
+            .sort("_id", pymongo.ASCENDING)
+            .skip(0 if after else start)
+            .limit(limit)
+            .to_list()
+        )
+        names = await collector_names(db, donations)
+        return [donation_to_row(d, names) for d in donations]
+
+    return await RESPONSE_CACHE.respond(
+        request, guild_id, await guild_version(db), build
+    )
+
+
+def last_event_id(request: Request) -> int | None:
+    with contextlib.suppress(KeyError, ValueError):
+        return int(request.headers["Last-Event-ID"])
+    return None
+
+
+async def change_to_event(db: AsyncDatabase, change: Change) -> bytes:
+    id = str(change.sequence)
+    if change.operation == "reset":
+        return sse_event("reset", id, {})
+    assert change.time
+    if change.donation is None:
+        return sse_event(
+            "delete",
+            id,
+            {"time": change.time.replace(tzinfo=datetime.timezone.utc).isoformat()},
+        )
+    names = await collector_names(db, [change.donation])
+    row = export_row(change.donation, donation_collectors(change.donation, names))
+    return sse_event("insert", id, row | {"time": row["time"].isoformat()})
+
+
+# Declared before read_item, which would take "live" for an index
+@app.get("/donations/{guild_id}/live")
+async def live_donations(request: Request, guild_id: int) -> StreamingResponse:
+    # Server-Sent Events: "insert" with the donation as exported, "delete" with
+    # its time and "reset" when changes were lost and the client should reload
+    # through read_range. Event ids number the changes of the guild, clients
+    # reconnecting with the id of their last event first get what they missed
+    db = mongo[str(guild_id)]
+    after = last_event_id(request)
+
+    async def events() -> typing.AsyncIterator[bytes]:
+        async with LIVE_FEED.subscribe(db) as changes:
+            # Subscribed first, so nothing falls between the replay and the
+            # feed. The feed skips what was replayed, and a gap in it (changes
+            # made before its watcher started) is filled by replaying again
+            replayed = after
+            while True:
+                if replayed is not None:
+                    replayed, missed = await changes_since(db, replayed)
+                    for missed_change in missed:
+                        yield await change_to_event(db, missed_change)
+                while True:
+                    try:
+                        change = await asyncio.wait_for(changes.get(), LIVE_KEEPALIVE)
+                    except TimeoutError:
+                        yield b": keepalive\n\n"
+                        continue
+                    if change is None:
+                        return
+                    if replayed is not None and change.operation != "reset":
+                        if change.sequence <= replayed:
+                            continue
+                        if change.sequence > replayed + 1:
+                            break
+                    yield await change_to_event(db, change)
+                    replayed = change.sequence
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/donations/{guild_id}/{donation_index}", response_model=str)
+async def read_item(request: Request, guild_id: int, donation_index: int) -> Response:
+    if donation_index < 0:
+        raise HTTPException(status_code=404, detail="Item not found")
+    db = mongo[str(guild_id)]
+
+    async def build() -> str:
+        donations = await (
+            db["donations"]
+            .find()
+            .sort("_id", pymongo.ASCENDING)
+            .skip(donation_index)
+            .limit(1)
+            .to_list()
+        )
+        if not donations:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return donation_to_row(donations[0], await collector_names(db, donations))
+
+    return await RESPONSE_CACHE.respond(
+        request, guild_id, await guild_version(db), build
+    )
+
+
+@app.get("/donations/{guild_id}/export/{format}")
+async def export_donations(
+    request: Request,
+    guild_id: int,
+    format: typing.Literal["csv", "ndjson", "parquet"],
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+    member: int | None = None,
+    ship: str | None = None,
+    commodity: str | None = None,
+) -> Response:
+    db = mongo[str(guild_id)]
+    # Too large to cache, but unchanged exports still need not be sent again
+    etag = f'"{await guild_version(db)}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    cursor = (
+        db["donations"]
+        .find(export_query(start, end, member, ship, commodity))
+        .sort("_id", pymongo.ASCENDING)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+
+    async def stream() -> typing.AsyncIterator[bytes]:
+        # One batch in memory at a time, whatever the size of the history
+        writer = WRITERS[format]()
+        try:
+            while donations := await cursor.to_list(EXPORT_BATCH_SIZE):
+                names = await collector_names(db, donations)
+                yield writer.write(
+                    [export_row(d, donation_collectors(d, names)) for d in donations]
+                )
+            yield writer.close()
+        finally:
+            await cursor.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="donations-{guild_id}.{format}"',
+            "ETag": etag,
+        },
     )
@@ -0,0 +1,113 @@
+import asyncio
+import collections
+import time
+
+import httpx
+
+DISCORD_API = "https://discord.com/api/v9"
+
+
+class DiscordUsers:
+    # Usernames by id from the Discord API, kept in an LRU with a TTL. Lookups
+    # of the same id share one request and requests wait out both the global
+    # and the /users route rate limit before they are sent
+    def __init__(self, token: str, size: int, ttl: float, concurrency: int):
+        self.token = token
+        self.size = size
+        self.ttl = ttl
+        self._client: httpx.AsyncClient | None = None
+        self._cache: collections.OrderedDict[
+            int, tuple[float, str]
+        ] = collections.OrderedDict()
+        self._pending: dict[int, asyncio.Task[str]] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._global_until = 0.0
+        self._route_until = 0.0
+
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=DISCORD_API,
+                headers={"Authorization": f"Bot {self.token}"},
+                timeout=10,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def cached(self, user_id: int) -> str | None:
+        if user_id in self._cache:
+            expires, name = self._cache[user_id]
+            if expires > time.monotonic():
+                self._cache.move_to_end(user_id)
+                return name
+            del self._cache[user_id]
+        return None
+
+    def remember(self, user_id: int, name: str) -> None:
+        self._cache[user_id] = (time.monotonic() + self.ttl, name)
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > self.size:
+            self._cache.popitem(last=False)
+
+    async def wait_for_rate_limit(self) -> None:
+        while (until := max(self._global_until, self._route_until)) > (
+            now := time.monotonic()
+        ):
+            await asyncio.sleep(until - now)
+
+    def update_rate_limit(self, res: httpx.Response) -> None:
+        now = time.monotonic()
+        if res.status_code == 429:
+            retry_after = float(
+                res.headers.get("Retry-After") or res.json().get("retry_after", 1)
+            )
+            if res.headers.get("X-RateLimit-Global") == "true":
+                self._global_until = max(self._global_until, now + retry_after)
+            else:
+                self._route_until = max(self._route_until, now + retry_after)
+        elif res.headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(res.headers.get("X-RateLimit-Reset-After", 0))
+            self._route_until = max(self._route_until, now + reset_after)
+
+    async def fetch(self, user_id: int) -> str | None:
+        async with self._semaphore:
+            while True:
+                await self.wait_for_rate_limit()
+                try:
+                    res = await self.client().get(f"/users/{user_id}")
+                except httpx.TransportError:
+                    return None
+                self.update_rate_limit(res)
+                if res.status_code != 429:
+                    break
+        if res.is_success:
+            return str(res.json().get("username", user_id))
+        # Unknown users keep their id, like before. Other errors (auth, outages)
+        # return None so they are not cached as unknown for a whole TTL
+        return str(user_id) if res.status_code == 404 else None
+
+    async def lookup(self, user_id: int) -> str:
+        try:
+            name = await self.fetch(user_id)
+            if name is None:
+                return str(user_id)
+            self.remember(user_id, name)
+            return name
+        finally:
+            del self._pending[user_id]
+
+    async def name(self, user_id: int) -> str:
+        if (name := self.cached(user_id)) is not None:
+            return name
+        if user_id not in self._pending:
+            self._pending[user_id] = asyncio.create_task(self.lookup(user_id))
+        # Shielded, a cancelled request must not cancel a lookup others wait on
+        return await asyncio.shield(self._pending[user_id])
+
+    async def names(self, ids: list[int]) -> dict[int, str]:
+        unique = list(dict.fromkeys(ids))
+        return dict(zip(unique, await asyncio.gather(*map(self.name, unique))))
@@ -0,0 +1,144 @@
+import csv
+import datetime
+import io
+import json
+import typing
+
+import pyarrow  # type: ignore
+import pyarrow.parquet  # type: ignore
+
+EXPORT_COLUMNS = [
+    "time",
+    "booty",
+    "profit",
+    "collectors",
+    "ship",
+    "location",
+    "owner",
+    "method",
+]
+EXPORT_SCHEMA = pyarrow.schema(
+    [
+        ("time", pyarrow.timestamp("ms", tz="UTC")),
+        ("booty", pyarrow.string()),
+        ("profit", pyarrow.int64()),
+        ("collectors", pyarrow.list_(pyarrow.string())),
+        ("ship", pyarrow.string()),
+        ("location", pyarrow.string()),
+        ("owner", pyarrow.string()),
+        ("method", pyarrow.string()),
+    ]
+)
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def export_query(
+    start: datetime.datetime | None,
+    end: datetime.datetime | None,
+    member: int | None,
+    ship: str | None,
+    commodity: str | None,
+) -> dict:
+    query: dict[str, typing.Any] = {}
+    if start or end:
+        query["_id"] = {}
+        if start:
+            query["_id"]["$gte"] = start
+        if end:
+            query["_id"]["$lt"] = end
+    if member is not None:
+        query["collectors"] = member
+    if ship:
+        query["ship.name"] = ship
+    if commodity:
+        query["booty.commodity"] = commodity
+    return query
+
+
+def export_row(donation: dict, collectors: list[str]) -> dict[str, typing.Any]:
+    return {
+        "time": donation["_id"].replace(tzinfo=datetime.timezone.utc),
+        "booty": ", ".join(
+            f"{b['amount']} SCU of {b['commodity']}" for b in donation["booty"]
+        ),
+        "profit": sum(b["profit"] for b in donation["booty"]),
+        "collectors": collectors,
+        "ship": donation["ship"]["name"] if "ship" in donation else None,
+        "location": donation.get("location"),
+        "owner": donation.get("owner"),
+        "method": donation.get("method"),
+    }
+
+
+class Writer(typing.Protocol):
+    def write(self, rows: list[dict[str, typing.Any]]) -> bytes:
+        ...
+
+    def close(self) -> bytes:
+        ...
+
+
+class CsvWriter:
+    def __init__(self) -> None:
+        self.header = True
+
+    def write(self, rows: list[dict[str, typing.Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, EXPORT_COLUMNS)
+        if self.header:
+            writer.writeheader()
+            self.header = False
+        for row in rows:
+            writer.writerow(
+                row
+                | {
+                    "time": row["time"].isoformat(),
+                    "collectors": ", ".join(row["collectors"]),
+                }
+            )
+        return buffer.getvalue().encode()
+
+    def close(self) -> bytes:
+        return self.write([]) if self.header else b""
+
+
+class NdjsonWriter:
+    def write(self, rows: list[dict[str, typing.Any]]) -> bytes:
+        return "".join(
+            json.dumps(row | {"time": row["time"].isoformat()}) + "\n" for row in rows
+        ).encode()
+
+    def close(self) -> bytes:
+        return b""
+
+
+class ParquetWriter:
+    # One row group per batch, the buffer only ever holds the latest one
+    def __init__(self) -> None:
+        self.buffer = io.BytesIO()
+        self.writer = pyarrow.parquet.ParquetWriter(self.buffer, EXPORT_SCHEMA)
+
+    def flush(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def write(self, rows: list[dict[str, typing.Any]]) -> bytes:
+        self.writer.write_table(pyarrow.Table.from_pylist(rows, EXPORT_SCHEMA))
+        return self.flush()
+
+    def close(self) -> bytes:
+        self.writer.close()
+        return self.flush()
+
+
+WRITERS: dict[str, typing.Callable[[], Writer]] = {
+    "csv": CsvWriter,
+    "ndjson": NdjsonWriter,
+    "parquet": ParquetWriter,
+}
@@ -0,0 +1,153 @@
+import asyncio
+import contextlib
+import datetime
+import json
+import logging
+import typing
+
+import pydantic
+import pymongo.errors
+from donation_rollups import rollup_state
+from pymongo.asynchronous.database import AsyncDatabase
+
+logger = logging.getLogger("uvicorn.error")
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+class Change(pydantic.BaseModel):
+    # "reset" when more changes were missed than the rollups log
+    operation: typing.Literal["insert", "delete", "reset"]
+    sequence: int
+    time: datetime.datetime | None = None
+    donation: dict | None = None
+
+
+async def changes_since(db: AsyncDatabase, version: int) -> tuple[int, list[Change]]:
+    state = await rollup_state(db)
+    logged = state.changes_since(version)
+    if logged is None:
+        return state.version, [Change(operation="reset", sequence=state.version)]
+    inserted = [change.time for _, change in logged if change.operation == "insert"]
+    donations = (
+        {d["_id"]: d async for d in db["donations"].find({"_id": {"$in": inserted}})}
+        if inserted
+        else {}
+    )
+    changes = []
+    for sequence, change in logged:
+        if change.operation == "delete":
+            changes.append(
+                Change(operation="delete", sequence=sequence, time=change.time)
+            )
+        # Inserts deleted again since are left out, their delete follows
+        elif change.time in donations:
+            changes.append(
+                Change(
+                    operation="insert",
+                    sequence=sequence,
+                    time=change.time,
+                    donation=donations[change.time],
+                )
+            )
+    return state.version, changes
+
+
+def sse_event(event: str, id: str, data: dict) -> bytes:
+    return f"event: {event}\nid: {id}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def end(queue: asyncio.Queue[Change | None]) -> None:
+    # Makes room for the None that ends the subscriber's stream
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+class DonationFeed:
+    # Inserted and deleted donations per guild. One watcher per guild fans out
+    # to every subscriber and stops with the last one. Subscribers too slow to
+    # keep up are ended, their clients reconnect and replay from the last event
+    def __init__(self, poll_interval: float, queue_size: int):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue[Change | None]]] = {}
+        self._watchers: dict[str, asyncio.Task[None]] = {}
+
+    @contextlib.asynccontextmanager
+    async def subscribe(
+        self, db: AsyncDatabase
+    ) -> typing.AsyncIterator[asyncio.Queue[Change | None]]:
+        queue: asyncio.Queue[Change | None] = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(db.name, set()).add(queue)
+        if db.name not in self._watchers:
+            self._watchers[db.name] = asyncio.create_task(self.run(db))
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(db.name, set())
+            subscribers.discard(queue)
+            if not subscribers and db.name in self._watchers:
+                self._subscribers.pop(db.name, None)
+                self._watchers.pop(db.name).cancel()
+
+    async def close(self) -> None:
+        watchers = list(self._watchers.values())
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+    def publish(self, name: str, change: Change) -> None:
+        subscribers = self._subscribers.get(name, set())
+        for queue in list(subscribers):
+            try:
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                subscribers.discard(queue)
+                end(queue)
+
+    async def run(self, db: AsyncDatabase) -> None:
+        try:
+            await self.watch(db)
+        except Exception:
+            logger.exception(f"Donation feed of {db.name} failed")
+        finally:
+            if self._watchers.get(db.name) is asyncio.current_task():
+                del self._watchers[db.name]
+            for queue in self._subscribers.pop(db.name, set()):
+                end(queue)
+
+    async def watch(self, db: AsyncDatabase) -> None:
+        # Every donation write bumps the version of the "total" rollup and logs
+        # the change there, so the version numbers changes for resuming clients
+        # and a change to that document is all there is to wait for
+        try:
+            stream = await db["donation_rollups"].watch(
+                [{"$match": {"documentKey._id": "total"}}]
+            )
+        except pymongo.errors.OperationFailure as e:
+            if e.code != CHANGE_STREAMS_UNSUPPORTED:
+                raise
+            logger.info(f"No change streams on this mongod, polling {db.name}")
+            await self.poll(db)
+            return
+
+        async with stream:
+            version = (await rollup_state(db)).version
+            async for _ in stream:
+                version = await self.catch_up(db, version)
+
+    async def poll(self, db: AsyncDatabase) -> None:
+        # Standalone mongods have no change streams. Idle guilds cost one
+        # find_one per interval
+        version = (await rollup_state(db)).version
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            version = await self.catch_up(db, version)
+
+    async def catch_up(self, db: AsyncDatabase, version: int) -> int:
+        version, changes = await changes_since(db, version)
+        for change in changes:
+            self.publish(db.name, change)
+        return version
@@ -0,0 +1,61 @@
+import collections
+import threading
+import typing
+
+import fastapi
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def etag_matches(request: fastapi.Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ResponseCache:
+    # JSON bodies by (guild, version, path, query), a new version makes every
+    # older entry of the guild unreachable and the LRU drops them over time
+    def __init__(self, size: int):
+        self.size = size
+        self._cache: collections.OrderedDict[tuple, bytes] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def put(self, key: tuple, body: bytes) -> None:
+        with self._lock:
+            self._cache[key] = body
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+
+    async def respond(
+        self,
+        request: fastapi.Request,
+        guild_id: int,
+        version: str,
+        build: typing.Callable[[], typing.Awaitable[typing.Any]],
+    ) -> fastapi.Response:
+        etag = f'"{version}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return fastapi.Response(status_code=304, headers=headers)
+
+        key = (
+            guild_id,
+            version,
+            request.url.path,
+            tuple(sorted(request.query_params.multi_items())),
+        )
+        if (body := self.get(key)) is None:
+            body = bytes(JSONResponse(jsonable_encoder(await build())).body)
+            self.put(key, body)
+        return fastapi.Response(body, media_type="application/json", headers=headers)
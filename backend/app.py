@@ -1,6 +1,7 @@
 import asyncio
 import datetime
 import enum
+import io
 import math
 import pathlib
 import re
@@ -11,34 +12,54 @@ import uuid
 
 import discord
 import httpx
-import matplotlib.pyplot
 import numpy
 import pymongo
+from booty import BootySyntaxError, parse_booty
 from buttons import (DisplayOrgButton, GenericShowEmbedButton, KickButton,
-                     SnareCheckButton, UpdateAllButton)
-from classes import Organisation, ParsingException, Profile
+                     SnareCheckButton, UpdateAllButton, UpdateRolesButton)
+from classes import Organisation, ParsingException, Profile, Rank
+from commodities import CommodityResolver
+from commodity_embeddings import require_embeddings
 from constants import *
-from dateutil.relativedelta import relativedelta
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_core.documents import Document
+from database import Mongo
+from discord.ext import tasks
+from donation_chart import CHART_FILENAME, DONATION_CHARTS, pretty_number
+from donation_rollups import (Window, add_donation, build_rollups,
+                              donation_summary, remove_donation, total_profit)
 from loguru import logger
-from numpy import linspace, loadtxt
-from readable_number import ReadableNumber  # type: ignore
-from rsi_profile import (extract_profile_info, org_to_embed, orgs_lookup,
-                         profile_to_embed, url_to_org)
+from member_names import backfill_collector_names, remember_members
+from org_roster import roster_index
+from profile_sync import ProfileChange, ProfileCheck, check_profile
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from rsi_profile import (EMBED_CACHE, extract_profile_info, org_to_embed,
+                         orgs_lookup, profile_to_embed, url_to_org)
+from scheduler import RSI, Lane, lane
 from snare import (Snare, line_point_dist, location_to_str, point_point_dist,
                    pretty_print_dist)
+from warmup import WARMUP
 
-EMBEDDINGS = HuggingFaceEmbeddings(model_name="sentence-transformers/sentence-t5-xxl")
-COMMODITIES_DB = Chroma.from_documents(
-    [Document(page_content=c) for c in COMMODITIES],
-    EMBEDDINGS,
-    collection_name="commodities",
+mongo = Mongo(MONGODB_DOMAIN, 27017, MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE)
+COMMODITY_RESOLVER = CommodityResolver(
+    mongo["global"]["commodity_corrections"], COMMODITY_MEMO_SIZE
 )
-mongo: pymongo.MongoClient = pymongo.MongoClient(MONGODB_DOMAIN, 27017)
 
-client = discord.Client(command_prefix=PREFIX, intents=discord.Intents.all())
+
+class Calypso(discord.Client):
+    async def setup_hook(self) -> None:
+        await mongo.start()
+        # Before the gateway connects, so no /donation runs during a build
+        for name in await mongo.client.list_database_names():
+            if "donations" in await mongo[name].list_collection_names():
+                if await build_rollups(mongo[name]):
+                    logger.info(f"Built donation rollups of {name}")
+
+    async def close(self) -> None:
+        await super().close()
+        await mongo.close()
+
+
+client = Calypso(command_prefix=PREFIX, intents=discord.Intents.all())
 tree = discord.app_commands.CommandTree(client)
 
 
@@ -50,7 +71,7 @@ class LetInButton(discord.ui.Button):
     async def callback(self, interaction: discord.Interaction) -> None:
         if isinstance(interaction.guild, discord.Guild):
             member = interaction.guild.get_member(self.member_id)
-            startrole = mongo[str(interaction.guild.id)]["config"].find_one(
+            startrole = await mongo[str(interaction.guild.id)]["config"].find_one(
                 {"_id": "startrole"}
             )
             if startrole and member:
@@ -58,7 +79,7 @@ class LetInButton(discord.ui.Button):
                 if role:
                     await member.add_roles(role)
 
-                    desired_nick = get_desired_nick(member)
+                    desired_nick = await get_desired_nick(member)
                     if desired_nick:
                         await member.edit(nick=desired_nick)
 
@@ -106,22 +127,27 @@ async def check_guild(interaction: discord.Interaction) -> bool:
     return True
 
 
-def get_members_without_rsi_profiles(guild: discord.Guild) -> list[discord.Member]:
-    return [
-        m
-        for m in guild.members
-        if not m.bot and not mongo["global"]["profiles"].find_one({"_id": m.id})
-    ]
+async def get_rsi_profiles(members: typing.Sequence[discord.Member]) -> dict[int, dict]:
+    return {
+        p["_id"]: p
+        async for p in mongo["global"]["profiles"].find(
+            {"_id": {"$in": [m.id for m in members if not m.bot]}}
+        )
+    }
+
+
+async def get_members_without_rsi_profiles(
+    guild: discord.Guild,
+) -> list[discord.Member]:
+    profiles = await get_rsi_profiles(guild.members)
+    return [m for m in guild.members if not m.bot and m.id not in profiles]
 
 
-def get_members_with_rsi_profiles(
+async def get_members_with_rsi_profiles(
     guild: discord.Guild,
 ) -> list[tuple[discord.Member, dict]]:
-    res: list[tuple[discord.Member, dict]] = []
-    for m in guild.members:
-        if not m.bot and (dbm := mongo["global"]["profiles"].find_one({"_id": m.id})):
-            res.append((m, dbm))
-    return res
+    profiles = await get_rsi_profiles(guild.members)
+    return [(m, profiles[m.id]) for m in guild.members if m.id in profiles]
 
 
 def get_role_icon(member: discord.Member, sorted_db_roles: list[dict]) -> str:
@@ -132,20 +158,29 @@ def get_role_icon(member: discord.Member, sorted_db_roles: list[dict]) -> str:
     return ""
 
 
-def get_desired_nick(
+async def get_sorted_db_roles(guild: discord.Guild) -> list[dict]:
+    return sorted(
+        await mongo[str(guild.id)]["roles"].find().to_list(),
+        key=lambda r: r["priority"],
+    )
+
+
+async def get_desired_nick(
     member: discord.Member,
     sorted_db_roles: list | None = None,
     db_wings: list | None = None,
+    db_user: dict | None = None,
 ) -> str | None:
     GUILD_DB = mongo[str(member.guild.id)]
 
     if not sorted_db_roles:
-        sorted_db_roles = sorted(GUILD_DB["roles"].find(), key=lambda r: r["priority"])
+        sorted_db_roles = await get_sorted_db_roles(member.guild)
 
     if not db_wings:
-        db_wings = list(GUILD_DB["wings"].find())
+        db_wings = await GUILD_DB["wings"].find().to_list()
 
-    db_user = mongo["global"]["profiles"].find_one({"_id": member.id})
+    if not db_user:
+        db_user = await mongo["global"]["profiles"].find_one({"_id": member.id})
     if db_user:
         middle = db_user["nick"]
     else:
@@ -154,31 +189,31 @@ def get_desired_nick(
     return f"{get_role_icon(member, sorted_db_roles)} {middle} {get_role_icon(member, db_wings)}".strip()
 
 
-def get_wrong_nicks(guild: discord.Guild) -> list[tuple]:
+async def get_wrong_nicks(guild: discord.Guild) -> list[tuple]:
     GUILD_DB = mongo[str(guild.id)]
 
-    sorted_db_roles = sorted(GUILD_DB["roles"].find(), key=lambda r: r["priority"])
-    db_wings = list(GUILD_DB["wings"].find())
+    sorted_db_roles = await get_sorted_db_roles(guild)
+    db_wings = await GUILD_DB["wings"].find().to_list()
+    profiles = await get_rsi_profiles(guild.members)
     wrong_nicks = []
     for member in guild.members:
         if not member.bot:
-            desired_nick = get_desired_nick(member, sorted_db_roles, db_wings)
+            desired_nick = await get_desired_nick(
+                member, sorted_db_roles, db_wings, profiles.get(member.id)
+            )
 
             if desired_nick and desired_nick != member.nick:
                 wrong_nicks.append((member, desired_nick))
     return wrong_nicks
 
 
-def get_feedback_admins(
-    collection: pymongo.collection.Collection, guild: discord.Guild
-) -> typing.Generator[discord.Member, None, None]:
-    fba = collection.find_one({"_id": "feedbackadminrole"})
+async def get_feedback_admins(
+    collection: AsyncCollection, guild: discord.Guild
+) -> list[discord.Member]:
+    fba = await collection.find_one({"_id": "feedbackadminrole"})
     if not isinstance(fba, dict) or "value" not in fba:
-        return
-    for member in guild.members:
-        for role in member.roles:
-            if role.id == fba["value"]:
-                yield member
+        return []
+    return [m for m in guild.members if any(r.id == fba["value"] for r in m.roles)]
 
 
 # ======== PUBLIC COMMANDS ========
@@ -250,7 +285,7 @@ async def profile(interaction: discord.Interaction, username: str) -> None:
     await interaction.response.defer(thinking=True)
     url = RSI_BASE_URL + username
     try:
-        profile = extract_profile_info(url)
+        profile = await asyncio.to_thread(extract_profile_info, url)
     except ParsingException as e:
         await interaction.followup.send(
             f"An error happened, please contact an admin and send them the following: {url} | {e}",
@@ -265,13 +300,15 @@ async def profile(interaction: discord.Interaction, username: str) -> None:
             "nick": profile.handle,
         }
         try:
-            COLLECTION.insert_one(db_user)
+            await COLLECTION.insert_one(db_user)
         except pymongo.errors.DuplicateKeyError:
-            COLLECTION.replace_one({"_id": db_user["_id"]}, db_user)
+            await COLLECTION.replace_one({"_id": db_user["_id"]}, db_user)
 
         if isinstance(interaction.user, discord.Member):
             try:
-                await interaction.user.edit(nick=get_desired_nick(interaction.user))
+                await interaction.user.edit(
+                    nick=await get_desired_nick(interaction.user)
+                )
             except discord.errors.Forbidden as e:
                 logger.warning(
                     f'Cannot change nickname for "{interaction.user.name}": {e}'
@@ -298,14 +335,14 @@ async def whois(interaction: discord.Interaction, member: discord.Member) -> Non
         await interaction.followup.send(embed=get_bot_embed())
         return
 
-    db_user = mongo["global"]["profiles"].find_one({"_id": member.id})
+    db_user = await mongo["global"]["profiles"].find_one({"_id": member.id})
     view = discord.ui.View()
 
     if db_user:
         try:
-            profile = extract_profile_info(db_user["url"])
+            profile = await asyncio.to_thread(extract_profile_info, db_user["url"])
             try:
-                organisations = orgs_lookup(db_user["url"])
+                organisations = await asyncio.to_thread(orgs_lookup, db_user["url"])
             except ParsingException:
                 organisations = []
             if isinstance(organisations, list):
@@ -351,9 +388,9 @@ async def lookup(interaction: discord.Interaction, username: str) -> None:
     url = RSI_BASE_URL + username
     view = discord.ui.View()
     try:
-        profile = extract_profile_info(url)
+        profile = await asyncio.to_thread(extract_profile_info, url)
         try:
-            organisations = orgs_lookup(url)
+            organisations = await asyncio.to_thread(orgs_lookup, url)
         except ParsingException:
             organisations = []
         if isinstance(organisations, list):
@@ -439,7 +476,7 @@ async def feedback(
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB[f"feedback-{interaction.user.id}"]
 
-    initial = COLLECTION.find_one({"_id": member.id}) or {}
+    initial = await COLLECTION.find_one({"_id": member.id}) or {}
     new = {**initial}
     if written_feedback is not None:
         new["feedback"] = written_feedback
@@ -447,11 +484,11 @@ async def feedback(
         new["vote"] = vote.value
 
     try:
-        COLLECTION.insert_one({"_id": member.id, **new})
+        await COLLECTION.insert_one({"_id": member.id, **new})
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": member.id}, new)
+        await COLLECTION.replace_one({"_id": member.id}, new)
 
-    feedback_channel = GUILD_DB["config"].find_one({"_id": "feedbackchannel"})
+    feedback_channel = await GUILD_DB["config"].find_one({"_id": "feedbackchannel"})
     if isinstance(feedback_channel, dict) and "value" in feedback_channel:
         if initial != new:
             for channel in interaction.guild.channels:
@@ -506,7 +543,7 @@ async def myfeedback(
         f"# <@{m['_id']}>"
         + (f" - Vote: {Vote(m['vote']).name}" if "vote" in m and m["vote"] else "")
         + (f'\n{m["feedback"]}' if "feedback" in m and m["feedback"] else "")
-        for m in COLLECTION.find()
+        async for m in COLLECTION.find()
         if not member or member.id == m["_id"]
     ]
     await interaction.followup.send(
@@ -562,7 +599,7 @@ async def adminprofile(
     await interaction.response.defer(thinking=True, ephemeral=True)
     url = RSI_BASE_URL + username
     try:
-        profile = extract_profile_info(url)
+        profile = await asyncio.to_thread(extract_profile_info, url)
     except ParsingException as e:
         await interaction.followup.send(
             f"An error happened, please contact an admin and send them the following: {url} | {e}",
@@ -578,12 +615,12 @@ async def adminprofile(
             "nick": profile.handle,
         }
         try:
-            COLLECTION.insert_one(db_user)
+            await COLLECTION.insert_one(db_user)
         except pymongo.errors.DuplicateKeyError:
-            COLLECTION.replace_one({"_id": db_user["_id"]}, db_user)
+            await COLLECTION.replace_one({"_id": db_user["_id"]}, db_user)
 
         try:
-            await member.edit(nick=get_desired_nick(member))
+            await member.edit(nick=await get_desired_nick(member))
         except discord.errors.Forbidden as e:
             logger.warning(f'Cannot change nickname for "{member.mention}": {e}')
 
@@ -599,15 +636,15 @@ async def adminprofile(
         )
 
 
-def memberfeedback(
-    member: str, GUILD_DB: typing.Any, member_count: int
+async def memberfeedback(
+    member: str, GUILD_DB: AsyncDatabase, member_count: int
 ) -> discord.Embed | None:
     description = ""
     ayes = 0
     nays = 0
-    for collection_name in GUILD_DB.list_collection_names():
+    for collection_name in await GUILD_DB.list_collection_names():
         if "feedback-" in collection_name and (
-            f := GUILD_DB[collection_name].find_one({"_id": member})
+            f := await GUILD_DB[collection_name].find_one({"_id": member})
         ):
             member_id = collection_name.split("-")[-1]
             vote = Vote(f["vote"])
@@ -662,7 +699,7 @@ async def allfeedback(
     await interaction.response.defer(thinking=True, ephemeral=True)
 
     GUILD_DB = mongo[str(interaction.guild.id)]
-    fba = list(get_feedback_admins(GUILD_DB["config"], interaction.guild))
+    fba = await get_feedback_admins(GUILD_DB["config"], interaction.guild)
 
     if interaction.user not in fba:
         await interaction.followup.send(
@@ -680,17 +717,17 @@ async def allfeedback(
     embeds = []
     if member:
         embeds.append(
-            memberfeedback(str(member.id), GUILD_DB, tm)
+            await memberfeedback(str(member.id), GUILD_DB, tm)
             or discord.Embed(description=f"No feedback given for {member.mention} yet")
         )
 
     else:
         already_given = set()
-        for collection_name in GUILD_DB.list_collection_names():
+        for collection_name in await GUILD_DB.list_collection_names():
             if "feedback-" in collection_name:
-                for f in GUILD_DB[collection_name].find():
+                async for f in GUILD_DB[collection_name].find():
                     if f["_id"] not in already_given and (
-                        embed := memberfeedback(f["_id"], GUILD_DB, tm)
+                        embed := await memberfeedback(f["_id"], GUILD_DB, tm)
                     ):
                         embeds.append(embed)
                         already_given.add(f["_id"])
@@ -717,16 +754,16 @@ async def feedbackadmin(interaction: discord.Interaction, role: discord.Role) ->
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["config"]
     try:
-        COLLECTION.insert_one({"_id": "feedbackadminrole", "value": role.id})
+        await COLLECTION.insert_one({"_id": "feedbackadminrole", "value": role.id})
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "feedbackadminrole"}, {"value": role.id})
+        await COLLECTION.replace_one({"_id": "feedbackadminrole"}, {"value": role.id})
 
     await interaction.followup.send(
         embed=discord.Embed(
             title="Feedback admins",
             description="\n".join(
                 f"- {a.mention}"
-                for a in get_feedback_admins(COLLECTION, interaction.guild)
+                for a in await get_feedback_admins(COLLECTION, interaction.guild)
             ),
         ),
         ephemeral=True,
@@ -748,14 +785,14 @@ async def feedbackchannel(
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["config"]
     try:
-        COLLECTION.insert_one({"_id": "feedbackchannel", "value": channel.id})
+        await COLLECTION.insert_one({"_id": "feedbackchannel", "value": channel.id})
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "feedbackchannel"}, {"value": channel.id})
+        await COLLECTION.replace_one({"_id": "feedbackchannel"}, {"value": channel.id})
 
     await interaction.followup.send(
         embed=discord.Embed(
             title="Feedback updates channel",
-            description=f"<#{COLLECTION.find_one({'_id': 'feedbackchannel'})['value']}>",  # type: ignore
+            description=f"<#{(await COLLECTION.find_one({'_id': 'feedbackchannel'}))['value']}>",  # type: ignore
         ),
         ephemeral=True,
     )
@@ -806,7 +843,7 @@ async def startop(
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["ops"]
 
-    if description := COLLECTION.find_one({"_id": lookup}):
+    if description := await COLLECTION.find_one({"_id": lookup}):
         text = f'An active operation is currently underway in "{channel.name.split("・")[-1]}".\n\n{description["description"]}\n\nIf you are not interested in participating in this operation please leave the voice channel. However, if you are, remember to respect ranks and good luck!'
         CURRENT_OPS[str(channel.id)] = {
             "audio_file": elevenlabs_tts(text, VOICE_IDS["Dooley"]),
@@ -888,7 +925,7 @@ async def listops(interaction: discord.Interaction) -> None:
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["ops"]
     embed = discord.Embed(title="Operations")
-    for c in COLLECTION.find():
+    async for c in COLLECTION.find():
         embed.add_field(name=c["_id"], value=c["description"])
     await interaction.response.send_message(
         embed=embed, ephemeral=True, delete_after=MESSAGE_TIMEOUT
@@ -912,9 +949,9 @@ async def setop(
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["ops"]
     try:
-        COLLECTION.insert_one({"_id": lookup, "description": description})
+        await COLLECTION.insert_one({"_id": lookup, "description": description})
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": lookup}, {"description": description})
+        await COLLECTION.replace_one({"_id": lookup}, {"description": description})
 
     embed = discord.Embed(title=lookup, description=description)
     await interaction.response.send_message(
@@ -935,9 +972,9 @@ async def setbotvoice(
     GUILD_DB = mongo[str(interaction.guild.id)]
     COLLECTION = GUILD_DB["config"]
     try:
-        COLLECTION.insert_one({"_id": "botvoice", "value": channel.id})
+        await COLLECTION.insert_one({"_id": "botvoice", "value": channel.id})
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "botvoice"}, {"value": channel.id})
+        await COLLECTION.replace_one({"_id": "botvoice"}, {"value": channel.id})
 
     await interaction.response.send_message(
         f"Set bot voice channel to {channel.mention}",
@@ -993,7 +1030,7 @@ async def setorg(interaction: discord.Interaction, sid: str) -> None:
     url = f"https://robertsspaceindustries.com/orgs/{sid}"
 
     try:
-        org = url_to_org(url, None)
+        org = await asyncio.to_thread(url_to_org, url, None)
         assert isinstance(org, Organisation)
         embed = org_to_embed(org)
     except ParsingException as e:
@@ -1002,12 +1039,12 @@ async def setorg(interaction: discord.Interaction, sid: str) -> None:
         )
     COLLECTION = mongo[str(interaction.guild.id)]["config"]
     try:
-        COLLECTION.insert_one({"_id": "rsiorg", "sid": sid})
+        await COLLECTION.insert_one({"_id": "rsiorg", "sid": sid})
         await interaction.response.send_message(
             embed=embed, delete_after=MESSAGE_TIMEOUT
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "rsiorg"}, {"sid": sid})
+        await COLLECTION.replace_one({"_id": "rsiorg"}, {"sid": sid})
         await interaction.response.send_message(
             embed=embed, delete_after=MESSAGE_TIMEOUT
         )
@@ -1038,13 +1075,13 @@ async def addrole(
     COLLECTION = mongo[str(interaction.guild.id)]["roles"]
     db_role = {"_id": role.id, "icon": icon, "priority": priority, "rsirank": rsirank}
     try:
-        COLLECTION.insert_one(db_role)
+        await COLLECTION.insert_one(db_role)
         await interaction.followup.send(
             f"Added role: {role.mention} (`{priority} | {rsirank}/5 | {icon}`)",
             ephemeral=True,
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": role.id}, db_role)
+        await COLLECTION.replace_one({"_id": role.id}, db_role)
         await interaction.followup.send(
             f"Updated role: {role.mention} (`{priority} | {rsirank}/5 | {icon}`)",
             ephemeral=True,
@@ -1071,12 +1108,12 @@ async def addwing(
     COLLECTION = mongo[str(interaction.guild.id)]["wings"]
     db_role = {"_id": role.id, "icon": icon}
     try:
-        COLLECTION.insert_one(db_role)
+        await COLLECTION.insert_one(db_role)
         await interaction.response.send_message(
             f"Added wing: {role.mention} - {icon}", delete_after=MESSAGE_TIMEOUT
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": role.id}, db_role)
+        await COLLECTION.replace_one({"_id": role.id}, db_role)
         await interaction.response.send_message(
             f"Updated wing: {role.mention} - {icon}", delete_after=MESSAGE_TIMEOUT
         )
@@ -1097,7 +1134,7 @@ async def delrole(interaction: discord.Interaction, role: discord.Role) -> None:
         )
         return
 
-    res = mongo[str(interaction.guild.id)]["roles"].delete_one({"_id": role.id})
+    res = await mongo[str(interaction.guild.id)]["roles"].delete_one({"_id": role.id})
 
     if not res.deleted_count:
         await interaction.response.send_message(
@@ -1125,7 +1162,7 @@ async def delwing(interaction: discord.Interaction, role: discord.Role) -> None:
         )
         return
 
-    res = mongo[str(interaction.guild.id)]["wings"].delete_one({"_id": role.id})
+    res = await mongo[str(interaction.guild.id)]["wings"].delete_one({"_id": role.id})
 
     if not res.deleted_count:
         await interaction.response.send_message(
@@ -1153,12 +1190,7 @@ async def listroles(interaction: discord.Interaction) -> None:
         )
         return
 
-    roles: list[dict] = list(
-        sorted(
-            mongo[str(interaction.guild.id)]["roles"].find(),
-            key=lambda r: r["priority"],
-        )
-    )
+    roles: list[dict] = await get_sorted_db_roles(interaction.guild)
     if not roles:
         await interaction.response.send_message(
             "No roles added yet", delete_after=MESSAGE_TIMEOUT
@@ -1195,9 +1227,9 @@ async def listwings(interaction: discord.Interaction) -> None:
     COLLECTION = mongo[str(interaction.guild.id)]["wings"]
     wings: list[dict] = []
     role_ids = [w.id for w in interaction.guild.roles]
-    for wing in COLLECTION.find():
+    async for wing in COLLECTION.find():
         if wing["_id"] not in role_ids:
-            COLLECTION.delete_one(wing)
+            await COLLECTION.delete_one(wing)
         else:
             wings.append(wing)
 
@@ -1225,9 +1257,17 @@ async def status(interaction: discord.Interaction) -> None:
 
     assert interaction.guild
 
+    db_members = [
+        db for _, db in await get_members_with_rsi_profiles(interaction.guild)
+    ]
+    msg = await interaction.followup.send(
+        f"Validating 0/{len(db_members)} linked RSI profiles...", wait=True
+    )
+    checks = await validate_profiles(db_members, msg)
+
     view = discord.ui.View()
 
-    missing_members = get_members_without_rsi_profiles(interaction.guild)
+    missing_members = await get_members_without_rsi_profiles(interaction.guild)
     total_members = len([m for m in interaction.guild.members if not m.bot])
 
     description = f" {total_members - len(missing_members)}/{total_members} members have linked their RSI profiles"
@@ -1248,7 +1288,7 @@ async def status(interaction: discord.Interaction) -> None:
             )
         )
 
-    wrong_nicks = get_wrong_nicks(interaction.guild)
+    wrong_nicks = await get_wrong_nicks(interaction.guild)
     if not wrong_nicks:
         description += f"✅ {total_members - len(wrong_nicks)}/{total_members} members have correct nicknames"
     else:
@@ -1276,19 +1316,285 @@ async def status(interaction: discord.Interaction) -> None:
             )
         )
 
-    for member, db_member in get_members_with_rsi_profiles(interaction.guild):
-        try:
-            rsi_profile = extract_profile_info(db_member["url"])
-        except ParsingException as e:
-            await interaction.followup.send(
-                f"An error happened, please contact an admin and send them the following: {db_member['url']} | {e}"
+    GUILD_DB = mongo[str(interaction.guild.id)]
+    last_status = await GUILD_DB["config"].find_one({"_id": "laststatus"})
+    since = (
+        last_status["value"]
+        if last_status
+        else datetime.datetime.utcnow() - PROFILE_MAX_AGE
+    )
+    try:
+        await GUILD_DB["config"].insert_one(
+            {"_id": "laststatus", "value": datetime.datetime.utcnow()}
+        )
+    except pymongo.errors.DuplicateKeyError:
+        await GUILD_DB["config"].replace_one(
+            {"_id": "laststatus"}, {"value": datetime.datetime.utcnow()}
+        )
+
+    records = await (
+        mongo["global"]["profile_changes"]
+        .find(
+            {
+                "member": {"$in": [c.member_id for c in checks]},
+                "change": {"$ne": ProfileChange.Disappeared.value},
+                "time": {"$gt": since},
+            }
+        )
+        .sort("time", pymongo.ASCENDING)
+        .to_list()
+    )
+    changed_members = {r["member"] for r in records}
+    missing = [c for c in checks if c.missing]
+    unchanged = [
+        c
+        for c in checks
+        if not c.missing and not c.error and c.member_id not in changed_members
+    ]
+    cached = len([c for c in checks if c.cached])
+    description += f"\n{'✅' if len(unchanged) == len(checks) else '❌'} {len(unchanged)}/{len(checks)} linked RSI profiles are unchanged since the last status report ({cached} checked within the last {PROFILE_MAX_AGE})"
+
+    if missing:
+        view.add_item(
+            GenericShowEmbedButton(
+                discord.Embed(
+                    title="Members whose RSI profile disappeared",
+                    description="\n".join(
+                        f"- <@{c.member_id}>: {c.url}" for c in missing
+                    ),
+                ),
+                None,
+                label=f"Show disappeared ({len(missing)})",
+                style=discord.ButtonStyle.red,
+            )
+        )
+
+    for change, title in [
+        (ProfileChange.Handle, "Members with changed RSI handles"),
+        (ProfileChange.LostOrg, "Members who lost their main org"),
+        (ProfileChange.Org, "Members who changed main org"),
+        (ProfileChange.Rank, "Members with changed org rank"),
+    ]:
+        changed = [r for r in records if r["change"] == change.value]
+        if changed:
+            view.add_item(
+                GenericShowEmbedButton(
+                    discord.Embed(
+                        title=title,
+                        description="\n".join(
+                            f'- <@{r["member"]}>: "{r["old"] or "-"}" -> "{r["new"] or "-"}"'
+                            for r in changed
+                        ),
+                    ),
+                    None,
+                    label=f"Show {change.value} changes ({len(changed)})",
+                    style=discord.ButtonStyle.red,
+                )
+            )
+
+    errors = [c for c in checks if c.error]
+    if errors:
+        view.add_item(
+            GenericShowEmbedButton(
+                discord.Embed(
+                    title="RSI profiles that could not be checked",
+                    description="\n".join(
+                        f"- <@{c.member_id}>: {c.url} | {c.error}" for c in errors
+                    ),
+                ),
+                None,
+                label=f"Show errors ({len(errors)})",
+                style=discord.ButtonStyle.gray,
             )
+        )
 
     embed = discord.Embed(
         title=f'"{interaction.guild.name}" status',
         description=description,
     )
-    await interaction.followup.send(embed=embed, view=view)
+    await msg.edit(content=None, embed=embed, view=view)
+
+
+async def validate_profiles(
+    db_members: list[dict], progress: discord.WebhookMessage | None = None
+) -> list[ProfileCheck]:
+    semaphore = asyncio.Semaphore(PROFILE_WORKERS)
+
+    async def worker(db_member: dict) -> ProfileCheck:
+        async with semaphore:
+            return await asyncio.to_thread(check_profile, db_member, PROFILE_MAX_AGE)
+
+    with lane(Lane.BACKGROUND):
+        tasks = [asyncio.create_task(worker(m)) for m in db_members]
+
+    checks: list[ProfileCheck] = []
+    last_progress = time.monotonic()
+    for task in asyncio.as_completed(tasks):
+        check = await task
+        if check.update:
+            await mongo["global"]["profiles"].update_one(
+                {"_id": check.member_id}, {"$set": check.update}
+            )
+        if check.changes:
+            await mongo["global"]["profile_changes"].insert_many(check.change_records())
+        checks.append(check)
+
+        if progress and time.monotonic() - last_progress > PROGRESS_INTERVAL:
+            last_progress = time.monotonic()
+            await progress.edit(
+                content=f"Validating {len(checks)}/{len(db_members)} linked RSI profiles..."
+            )
+    return checks
+
+
+async def get_rank_role_changes(
+    guild: discord.Guild, index: dict[str, Rank]
+) -> tuple[
+    list[tuple[discord.Member, list[discord.Role], list[discord.Role]]],
+    list[discord.Member],
+]:
+    # Highest priority role wins if several roles map to the same RSI rank
+    rank_roles: dict[int, discord.Role] = {}
+    for db_role in await get_sorted_db_roles(guild):
+        role = guild.get_role(db_role["_id"])
+        if role and "rsirank" in db_role:
+            rank_roles.setdefault(db_role["rsirank"], role)
+    all_rank_roles = set(rank_roles.values())
+
+    changes = []
+    not_in_org = []
+    for member, db_member in await get_members_with_rsi_profiles(guild):
+        rank = index.get(db_member.get("handle", db_member["nick"]).lower())
+        if not rank:
+            not_in_org.append(member)
+            continue
+
+        expected = {rank_roles[rank.rank]} if rank.rank in rank_roles else set()
+        current = {r for r in member.roles if r in all_rank_roles}
+        if expected != current:
+            changes.append((member, list(expected - current), list(current - expected)))
+    return changes, not_in_org
+
+
+@tree.command(
+    name="rankroles",
+    description=f"Compare member roles to their RSI org rank (see {PREFIX}setorg and {PREFIX}addrole)",
+)
+async def rankroles(interaction: discord.Interaction) -> None:
+    if not await check_admin(interaction):
+        return
+    if not isinstance(interaction.guild, discord.Guild):
+        await interaction.response.send_message(
+            "Command only available inside guild",
+            ephemeral=True,
+            delete_after=MESSAGE_TIMEOUT,
+        )
+        return
+
+    rsiorg = await mongo[str(interaction.guild.id)]["config"].find_one(
+        {"_id": "rsiorg"}
+    )
+    if not rsiorg:
+        await interaction.response.send_message(
+            f"No RSI org set yet, please set it with `{PREFIX}setorg`",
+            delete_after=MESSAGE_TIMEOUT,
+        )
+        return
+
+    await interaction.response.defer(thinking=True)
+
+    try:
+        with lane(Lane.BACKGROUND):
+            index = await asyncio.to_thread(roster_index, rsiorg["sid"])
+    except ParsingException as e:
+        await interaction.followup.send(
+            f"An error happened, please contact an admin and send them the following: {rsiorg['sid']} | {e}"
+        )
+        return
+
+    changes, not_in_org = await get_rank_role_changes(interaction.guild, index)
+    linked = len(await get_members_with_rsi_profiles(interaction.guild))
+    description = f"{len(index)} visible members in `{rsiorg['sid']}`\n"
+    view = discord.ui.View()
+
+    if not changes:
+        description += f"✅ {linked - len(not_in_org)}/{linked - len(not_in_org)} members have roles matching their RSI rank\n"
+    else:
+        description += f"❌ {linked - len(not_in_org) - len(changes)}/{linked - len(not_in_org)} members have roles matching their RSI rank\n"
+        changes_view = discord.ui.View()
+        changes_view.add_item(
+            UpdateRolesButton(
+                role_changes=changes,
+                label="Update all roles",
+                style=discord.ButtonStyle.red,
+            )
+        )
+        view.add_item(
+            GenericShowEmbedButton(
+                discord.Embed(
+                    title="Members with roles not matching their RSI rank",
+                    description="\n".join(
+                        f"- {m.mention}: "
+                        + " ".join(
+                            [f"+{r.mention}" for r in add]
+                            + [f"-{r.mention}" for r in remove]
+                        )
+                        for m, add, remove in changes
+                    ),
+                ),
+                changes_view,
+                label="Show wrong roles",
+                style=discord.ButtonStyle.red,
+            )
+        )
+
+    if not_in_org:
+        description += f"❓ {len(not_in_org)}/{linked} members with linked RSI profiles are not visible in `{rsiorg['sid']}`"
+        view.add_item(
+            GenericShowEmbedButton(
+                discord.Embed(
+                    title=f"Members not visible in {rsiorg['sid']}",
+                    description="\n".join(f"- {m.mention}" for m in not_in_org),
+                ),
+                None,
+                label="Show members not in org",
+                style=discord.ButtonStyle.gray,
+            )
+        )
+
+    await interaction.followup.send(
+        embed=discord.Embed(
+            title=f'"{interaction.guild.name}" RSI ranks', description=description
+        ),
+        view=view,
+    )
+
+
+@tree.command(
+    name="rsimetrics",
+    description="Show request scheduler and embed cache metrics for robertsspaceindustries.com lookups",
+)
+async def rsimetrics(interaction: discord.Interaction) -> None:
+    if not await check_admin(interaction):
+        return
+
+    embed = discord.Embed(
+        title="RSI request scheduler",
+        description=f"`{RSI.rate:g}` requests/s with bursts of up to `{RSI.burst}`",
+    )
+    for l, m in RSI.metrics().items():
+        embed.add_field(
+            name=l.name.capitalize(),
+            value=f"Queued: `{m.queued}`\nRequests: `{m.requests}`\nRetries: `{m.retries}`\nAvg. wait: `{m.avg_wait():.2f}s`\nMax wait: `{m.max_wait:.2f}s`",
+        )
+    cache = EMBED_CACHE.metrics()
+    embed.add_field(
+        name="Embed cache",
+        value=f"Cached: `{cache.size}/{EMBED_CACHE_SIZE}`\nHits: `{cache.hits}`\nMisses: `{cache.misses}`\nHit rate: `{cache.hit_rate():.0%}`",
+    )
+    await interaction.response.send_message(
+        embed=embed, ephemeral=True, delete_after=MESSAGE_TIMEOUT
+    )
 
 
 @tree.command(
@@ -1305,12 +1611,12 @@ async def adminchal(
 
     COLLECTION = mongo[str(interaction.guild.id)]["config"]
     try:
-        COLLECTION.insert_one({"_id": "adminchal", "channel": channel.id})
+        await COLLECTION.insert_one({"_id": "adminchal", "channel": channel.id})
         await interaction.response.send_message(
             f"Added admin channel {channel.mention}", delete_after=MESSAGE_TIMEOUT
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "adminchal"}, {"channel": channel.id})
+        await COLLECTION.replace_one({"_id": "adminchal"}, {"channel": channel.id})
         await interaction.response.send_message(
             f"Updated admin channel {channel.mention}", delete_after=MESSAGE_TIMEOUT
         )
@@ -1328,12 +1634,12 @@ async def startrole(interaction: discord.Interaction, role: discord.Role) -> Non
 
     COLLECTION = mongo[str(interaction.guild.id)]["config"]
     try:
-        COLLECTION.insert_one({"_id": "startrole", "role": role.id})
+        await COLLECTION.insert_one({"_id": "startrole", "role": role.id})
         await interaction.response.send_message(
             f"Added starting role {role.mention}", delete_after=MESSAGE_TIMEOUT
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": "startrole"}, {"role": role.id})
+        await COLLECTION.replace_one({"_id": "startrole"}, {"role": role.id})
         await interaction.response.send_message(
             f"Updated starting role {role.mention}", delete_after=MESSAGE_TIMEOUT
         )
@@ -1358,12 +1664,12 @@ async def addjoin(
 
     COLLECTION = mongo[str(interaction.guild.id)]["join"]
     try:
-        COLLECTION.insert_one({"_id": role.id, "text": text})
+        await COLLECTION.insert_one({"_id": role.id, "text": text})
         await interaction.response.send_message(
             f"Added text for join role {role.mention}", delete_after=MESSAGE_TIMEOUT
         )
     except pymongo.errors.DuplicateKeyError:
-        COLLECTION.replace_one({"_id": role.id}, {"text": text})
+        await COLLECTION.replace_one({"_id": role.id}, {"text": text})
         await interaction.response.send_message(
             f"Updated text for join role {role.mention}", delete_after=MESSAGE_TIMEOUT
         )
@@ -1384,7 +1690,9 @@ async def listjoin(interaction: discord.Interaction) -> None:
         )
         return
 
-    join_texts: list[dict] = list(mongo[str(interaction.guild.id)]["join"].find())
+    join_texts: list[dict] = (
+        await mongo[str(interaction.guild.id)]["join"].find().to_list()
+    )
     if not join_texts:
         await interaction.response.send_message(
             "No join texts added yet", delete_after=MESSAGE_TIMEOUT
@@ -1409,7 +1717,7 @@ async def addtrigger(interaction: discord.Interaction, role: discord.Role) -> No
     assert interaction.guild
 
     try:
-        mongo[str(interaction.guild.id)]["trigger"].insert_one({"_id": role.id})
+        await mongo[str(interaction.guild.id)]["trigger"].insert_one({"_id": role.id})
         await interaction.response.send_message(
             f"{role.mention} added as trigger role", delete_after=MESSAGE_TIMEOUT
         )
@@ -1435,7 +1743,9 @@ async def listtriggers(interaction: discord.Interaction) -> None:
         )
         return
 
-    trigger_roles: list[dict] = list(mongo[str(interaction.guild.id)]["trigger"].find())
+    trigger_roles: list[dict] = (
+        await mongo[str(interaction.guild.id)]["trigger"].find().to_list()
+    )
     if not trigger_roles:
         await interaction.response.send_message(
             "No trigger roles added yet", delete_after=MESSAGE_TIMEOUT
@@ -1453,7 +1763,7 @@ async def listtriggers(interaction: discord.Interaction) -> None:
     description='Add a "donation"',
 )
 @discord.app_commands.describe(
-    booty='A comma-separated list of donated goods, for instance, "72 RMC 766000, 100SCU of Gold for 670000 aUEC"',
+    booty='A comma-separated list of donated goods, for instance, "72 RMC 766k, 100SCU of Gold for 670k aUEC"',
     collectors='A list of all discord participants, for instance, "@User1 @UserTwo @Me"',
     ship="The ship flown by the target",
     owner='The username of the target, for instance, "bobBobberson42"',
@@ -1507,41 +1817,35 @@ async def donation(
             )
         )
 
-    parsed_donations = []
-    for d in booty.split(","):
-        while "  " in d:
-            d = d.replace("  ", " ")
-        d = d.replace(",", "")
-
-        if not re.match(r"\d+\D+\d+", d):
-            return await interaction.followup.send(
-                embed=discord.Embed(
-                    title="Error",
-                    description=f'Booty `{d}` is incorrectly formatted. `booty` must be a comma-separated list of donated goods on the format "amount" followed by "material" followed by "sell price", for instance, `72 RMC 766000, 100SCU of Gold for 670000 aUEC`. You can add units and filler words like "aUEC", "of" and "for" if it makes it easier for you, but I do not care.',
-                    colour=discord.Colour.red(),
-                )
+    try:
+        items = parse_booty(booty)
+    except BootySyntaxError as e:
+        return await interaction.followup.send(
+            embed=discord.Embed(
+                title="Error",
+                description=f'{e.message}:\n```\n{e.pointer()}\n```\n`booty` must be a comma-separated list of donated goods on the format "amount" followed by "material" followed by "sell price", for instance, `72 RMC 766k, 100SCU of Gold for 670,000 aUEC`. You can add units and filler words like "aUEC", "of" and "for" if it makes it easier for you, but I do not care.',
+                colour=discord.Colour.red(),
             )
-
-        _, tmp_amount, right = re.split(r"(\d+)", d, 1)
-        commodity, tmp_profit, _ = re.split(r"(\d+)", right, 1)
-        commodity = commodity.strip()
-        amount = int(tmp_amount)
-        profit = int(tmp_profit)
-
-        parsed_donations.append(
-            {
-                "commodity": COMMODITIES_DB.similarity_search(commodity)[
-                    0
-                ].page_content,
-                "amount": amount,
-                "profit": profit,
-            }
         )
 
+    if COMMODITY_EMBEDDING_MODEL:
+        await WARMUP.wait()
+    matches = await COMMODITY_RESOLVER.resolve([commodity for _, commodity, _ in items])
+    uncertain = [m for m in matches if m.ambiguous()]
+    parsed_donations = [
+        {
+            "commodity": match.commodity,
+            "amount": amount,
+            "profit": profit,
+        }
+        for (amount, _, profit), match in zip(items, matches)
+    ]
+
     document = {
         "_id": now,
         "booty": parsed_donations,
         "collectors": [m.id for m in members],
+        "collector_names": [m.name for m in members],
     }
     if ship:
         document["ship"] = {
@@ -1559,7 +1863,9 @@ async def donation(
     document["creator"] = interaction.user.id
 
     COLLECTION = mongo[str(interaction.guild.id)]["donations"]
-    COLLECTION.insert_one(document)
+    await COLLECTION.insert_one(document)
+    await add_donation(mongo[str(interaction.guild.id)], document)
+    await remember_members(mongo[str(interaction.guild.id)], members)
     embed = discord.Embed(
         title=f"Donation: {pretty_money(total_profit(document))}",
         description="- "
@@ -1585,6 +1891,16 @@ async def donation(
     )
 
     embed.add_field(name="To send", value=f"{int(to_send)} aUEC")
+    if uncertain:
+        embed.add_field(
+            name="Uncertain commodities",
+            value="\n".join(
+                f'- "{m.query}" read as {m.commodity} ({m.confidence:.0%})'
+                + (f", or {m.runner_up}?" if m.runner_up else "")
+                for m in uncertain
+            ),
+            inline=False,
+        )
     if "ship" in document:
         embed.set_author(
             name=document["ship"]["name"], icon_url=document["ship"]["icon_url"]  # type: ignore
@@ -1592,39 +1908,29 @@ async def donation(
     await interaction.followup.send(embed=embed)
 
 
-def total_profit(donation: dict) -> float:
-    return float(sum(d["profit"] for d in donation["booty"]))
-
-
-def pretty_number(number: float, precision: int = 2) -> str:
-    return str(ReadableNumber(number, use_shortform=True, precision=precision))
-
-
 def pretty_money(number: float, precision: int = 2, unit: str = "aUEC") -> str:
     return f"{pretty_number(number, precision)} {unit}".strip()
 
 
-def donations_to_desc(
-    title: str, donations: list[dict], show_donations: bool = False
-) -> str:
-    if not donations:
-        return ""
-    desc = f"{title} `{pretty_money(sum(total_profit(d) for d in donations))}`"
-    if show_donations:
-        desc += ":\n\n- " + "\n- ".join(
-            [
-                f'{d["_id"].strftime("%d %b %Y")}: {pretty_money(total_profit(d))} (ID: `{int(d["_id"].timestamp())}`)'
-                for d in donations
-            ]
-        )
-    return desc
+def window_to_desc(title: str, window: Window) -> str:
+    return f"{title} `{pretty_money(window.total)}`" if window.count else ""
+
+
+def rankings_to_desc(rankings: list[tuple[str, float]]) -> str:
+    return "\n".join(
+        f"{medal} {name} ({pretty_money(total)})"
+        for medal, (name, total) in zip(["🥇", "🥈", "🥉"], rankings)
+    )
 
 
 @tree.command(
     name="donations",
     description="Current donation overview",
 )
-async def donations(interaction: discord.Interaction) -> None:
+@discord.app_commands.describe(
+    raw="Plot every donation instead of a downsampled running total"
+)
+async def donations(interaction: discord.Interaction, raw: bool = False) -> None:
     if not isinstance(interaction.guild, discord.Guild):
         await interaction.response.send_message(
             "Command only available inside guild",
@@ -1633,89 +1939,35 @@ async def donations(interaction: discord.Interaction) -> None:
         )
         return
 
-    COLLECTION = mongo[str(interaction.guild.id)]["donations"]
-    if COLLECTION is not None:
-        now = datetime.datetime.utcnow()
-
-        last_24hr = []
-        last_7_days = []
-        this_month = []
-        this_year = []
-        yesterday = []
-        last_month = []
-        last_year = []
-        total = []
-        total_sums = []
-        running_total = 0.00
-        member_rankings = {}
-        ship_rankings = {}
-
-        for d in sorted(COLLECTION.find(), key=lambda c: c["_id"]):
-            tp = total_profit(d)
-            running_total += tp
-            total_sums.append((d["_id"], running_total))
-            profit_share = tp / len(d["collectors"])
-            for p in d["collectors"]:
-                if p not in member_rankings:
-                    member_rankings[p] = 0.0
-                member_rankings[p] += profit_share
-
-            if "ship" in d:
-                if d["ship"]["name"] not in ship_rankings:
-                    ship_rankings[d["ship"]["name"]] = 0.0
-                ship_rankings[d["ship"]["name"]] += tp
-
-            total.append(d)
-            if d["_id"].year == now.year:
-                this_year.append(d)
-                if d["_id"].month == now.month:
-                    this_month.append(d)
-
-            if (now - relativedelta(hours=24)) < d["_id"]:
-                last_24hr.append(d)
-            if (now - relativedelta(days=7)) < d["_id"]:
-                last_7_days.append(d)
-            if (now - relativedelta(days=1)).date == d["_id"].date:
-                yesterday.append(d)
-            if (now - relativedelta(month=1)).year == d["_id"].year and (
-                now - relativedelta(month=1)
-            ).month == d["_id"].month:
-                last_month.append(d)
-            if (now - relativedelta(years=1)).year == d["_id"].year:
-                last_year.append(d)
-
-        x = [i for i, _ in total_sums]
-        y = [t for _, t in total_sums]
-
-        fig, ax = matplotlib.pyplot.subplots()
-        img_png = f"{int(now.timestamp())}.png"
-
-        ax.plot(x, y, "r")
-        ax.get_yaxis().set_major_formatter(lambda d, _: pretty_number(d))
-        fig.autofmt_xdate()
-        fig.savefig(img_png)
-
-        os.system(f"curl https://upload.hutli.hu/sc/ --upload-file {img_png}")
-
-        mr = sorted(member_rankings.items(), key=lambda t: t[1], reverse=True)
-        sr = sorted(ship_rankings.items(), key=lambda t: t[1], reverse=True)
+    await interaction.response.defer(thinking=True)
+    db = mongo[str(interaction.guild.id)]
+    summary = await donation_summary(db, datetime.datetime.utcnow())
+    if summary.total.count:
+        png = await DONATION_CHARTS.render(db, summary.version, raw)
+
+        mr = sorted(summary.members.items(), key=lambda t: t[1], reverse=True)
+        sr = sorted(summary.ships.items(), key=lambda t: t[1], reverse=True)
         embed = discord.Embed(
             title="",
-            description=f"# All time total: `{pretty_money(sum([total_profit(t) for t in total]))}`"
-            + donations_to_desc("\n## Last 24 Hours:", last_24hr)
-            + donations_to_desc("\n**Last 7 Days**:", last_7_days)
-            + donations_to_desc("\n**Yesterday**:", yesterday)
-            + donations_to_desc("\n**This Month**:", this_month)
-            + donations_to_desc("\n**Last Month**:", last_month)
-            + donations_to_desc("\n**This Year**:", this_year)
-            + donations_to_desc("\n**Last Year**:", last_year)
-            + f"\n# Rich MFs:\n🥇 <@{mr[0][0]}> ({pretty_money(mr[0][1])})\n🥈 <@{mr[1][0]}> ({pretty_money(mr[1][1])})\n🥉 <@{mr[2][0]}> ({pretty_money(mr[2][1])})"
-            + f"\n# Donation Ships:\n🥇 {sr[0][0]} ({pretty_money(sr[0][1])})\n🥈 {sr[1][0]} ({pretty_money(sr[1][1])})\n🥉 {sr[2][0]} ({pretty_money(sr[2][1])})",
-        )
-        embed.set_image(url=f"https://public.hutli.hu/sc/{img_png}")
-        await interaction.response.send_message(embed=embed)
+            description=f"# All time total: `{pretty_money(summary.total.total)}`"
+            + window_to_desc("\n## Last 24 Hours:", summary.last_24_hours)
+            + window_to_desc("\n**Last 7 Days**:", summary.last_7_days)
+            + window_to_desc("\n**Yesterday**:", summary.yesterday)
+            + window_to_desc("\n**This Month**:", summary.this_month)
+            + window_to_desc("\n**Last Month**:", summary.last_month)
+            + window_to_desc("\n**This Year**:", summary.this_year)
+            + window_to_desc("\n**Last Year**:", summary.last_year)
+            + "\n# Rich MFs:\n"
+            + rankings_to_desc([(f"<@{m}>", t) for m, t in mr])
+            + "\n# Donation Ships:\n"
+            + rankings_to_desc(sr),
+        )
+        embed.set_image(url=f"attachment://{CHART_FILENAME}")
+        await interaction.followup.send(
+            embed=embed, file=discord.File(io.BytesIO(png), filename=CHART_FILENAME)
+        )
     else:
-        await interaction.response.send_message(
+        await interaction.followup.send(
             embed=discord.Embed(title='No "donations" yet...')
         )
 
@@ -1751,11 +2003,14 @@ async def deldonation(
                 delete_after=MESSAGE_TIMEOUT,
             )
     else:
-        donation_time = sorted(
-            d["_id"] for d in mongo[str(interaction.guild.id)]["donations"].find()
-        )[-1]
+        latest = await COLLECTION.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        if not latest:
+            return await interaction.response.send_message(
+                "No donations yet...", ephemeral=True, delete_after=MESSAGE_TIMEOUT
+            )
+        donation_time = latest["_id"]
 
-    to_delete = COLLECTION.find_one({"_id": donation_time})
+    to_delete = await COLLECTION.find_one({"_id": donation_time})
     if not to_delete:
         return await interaction.response.send_message(
             f'Could not find donation "{int(donation_time.timestamp())}"',
@@ -1774,8 +2029,9 @@ async def deldonation(
             delete_after=MESSAGE_TIMEOUT,
         )
 
-    res = COLLECTION.delete_one(to_delete)
+    res = await COLLECTION.delete_one(to_delete)
     if res.deleted_count:
+        await remove_donation(mongo[str(interaction.guild.id)], to_delete)
         total = 0
         if isinstance(interaction.channel, discord.TextChannel):
             async for m in interaction.channel.history(limit=None):
@@ -1801,7 +2057,59 @@ async def deldonation(
         )
 
 
+@tree.command(
+    name="commodityfix",
+    description="Confirm which commodity a booty spelling refers to in future donations",
+)
+@discord.app_commands.describe(
+    text='The booty spelling, for instance, "quanta"',
+    commodity="The commodity it refers to",
+)
+async def commodityfix(
+    interaction: discord.Interaction, text: str, commodity: str
+) -> None:
+    if not await check_admin(interaction):
+        return
+
+    if commodity not in COMMODITIES:
+        return await interaction.response.send_message(
+            f'Unknown commodity "{commodity}"',
+            ephemeral=True,
+            delete_after=MESSAGE_TIMEOUT,
+        )
+
+    key = await COMMODITY_RESOLVER.correct(text, commodity, interaction.user.id)
+    await interaction.response.send_message(
+        f'Booty "{key}" will now be read as {commodity}',
+        ephemeral=True,
+        delete_after=MESSAGE_TIMEOUT,
+    )
+
+
+@commodityfix.autocomplete("commodity")
+async def commodityfix_autocomplete(
+    interaction: discord.Interaction, current: str
+) -> list[discord.app_commands.Choice[str]]:
+    return [
+        discord.app_commands.Choice(name=c, value=c)
+        for c in COMMODITIES
+        if current.lower() in c.lower()
+    ][:25]
+
+
 # ======== EVENTS ========
+@client.event
+async def on_member_join(member: discord.Member) -> None:
+    await remember_members(mongo[str(member.guild.id)], [member])
+
+
+@client.event
+async def on_user_update(before: discord.User, after: discord.User) -> None:
+    if before.name != after.name:
+        for guild in after.mutual_guilds:
+            await remember_members(mongo[str(guild.id)], [after])
+
+
 @client.event
 async def on_member_update(before: discord.Member, after: discord.Member) -> None:
     is_new = (not after.joined_at) or (
@@ -1810,20 +2118,26 @@ async def on_member_update(before: discord.Member, after: discord.Member) -> Non
     )
     GUILD_DB = mongo[str(after.guild.id)]
     has_role = any(
-        t for t in GUILD_DB["roles"].find() if t["_id"] in [a.id for a in after.roles]
+        [
+            t
+            async for t in GUILD_DB["roles"].find()
+            if t["_id"] in [a.id for a in after.roles]
+        ]
     )
     if any(
-        t
-        for t in GUILD_DB["config"].find()
-        if t["_id"] not in [b.id for b in before.roles]
-        and t["_id"] in [a.id for a in after.roles]
+        [
+            t
+            async for t in GUILD_DB["config"].find()
+            if t["_id"] not in [b.id for b in before.roles]
+            and t["_id"] in [a.id for a in after.roles]
+        ]
     ) and (not has_role or is_new):
         description = f"## What we know about them:\n"
         try:
             await after.send(WELCOME_MSG.format(member=after.mention, prefix=PREFIX))
         except discord.errors.Forbidden:
             description = f"{after.mention} has disabled the ability for bots to send them direct messages - **please ask them to add their RSI profile manually with `{PREFIX}profile`**\n{description}"
-        adminchal = GUILD_DB["config"].find_one({"_id": "adminchal"})
+        adminchal = await GUILD_DB["config"].find_one({"_id": "adminchal"})
         if adminchal:
             channel = after.guild.get_channel(adminchal["channel"])
 
@@ -1848,9 +2162,11 @@ async def on_member_update(before: discord.Member, after: discord.Member) -> Non
                     title=after.name,
                     description=description
                     + "\n".join(
-                        f'- {j["text"]}'
-                        for j in GUILD_DB["join"].find()
-                        if j["_id"] in after_role_ids
+                        [
+                            f'- {j["text"]}'
+                            async for j in GUILD_DB["join"].find()
+                            if j["_id"] in after_role_ids
+                        ]
                     ),
                 )
                 embed.set_image(url=after.avatar)
@@ -1910,7 +2226,7 @@ async def on_voice_state_update(
         await after.channel.edit(status=":siren: LIVE OPERATION !!!")  # type: ignore
         GUILD_DB = mongo[str(member.guild.id)]
         COLLECTION = GUILD_DB["config"]
-        if bot_voice_id := COLLECTION.find_one({"_id": "botvoice"}):
+        if bot_voice_id := await COLLECTION.find_one({"_id": "botvoice"}):
             bot_voice = member.guild.get_channel(bot_voice_id["value"])
             if (
                 isinstance(bot_voice, discord.VoiceChannel)
@@ -1947,10 +2263,52 @@ async def on_voice_state_update(
                     )
 
 
+@tasks.loop(minutes=PROFILE_REFRESH_MINUTES)
+async def refresh_profiles() -> None:
+    stale = await (
+        mongo["global"]["profiles"]
+        .find(
+            {
+                "$or": [
+                    {"retry": {"$exists": False}},
+                    {"retry": {"$lte": datetime.datetime.utcnow()}},
+                ]
+            }
+        )
+        .sort("retry", pymongo.ASCENDING)
+        .limit(PROFILE_REFRESH_BATCH)
+        .to_list()
+    )
+    if stale:
+        checks = await validate_profiles(stale)
+        logger.info(
+            f"Refreshed {len(checks)} RSI profiles: {sum(len(c.changes) for c in checks)} changes, {len([c for c in checks if c.error])} errors"
+        )
+
+
+@tasks.loop(count=1)
+async def sync_member_names() -> None:
+    for guild in client.guilds:
+        db = mongo[str(guild.id)]
+        await remember_members(db, list(guild.members))
+        backfilled = await backfill_collector_names(db)
+        if backfilled:
+            logger.info(f"Stored collector names of {backfilled} donations in {guild}")
+
+
 @client.event
 async def on_ready() -> None:
     await tree.sync()
 
+    await mongo["global"]["profile_changes"].create_index(
+        [("member", pymongo.ASCENDING), ("time", pymongo.ASCENDING)]
+    )
+    if not refresh_profiles.is_running():
+        refresh_profiles.start()
+    if not sync_member_names.is_running():
+        sync_member_names.start()
+    WARMUP.start()
+
     await client.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching, name="for new ships..."
@@ -1958,5 +2316,7 @@ async def on_ready() -> None:
     )
 
 
-if DISCORD_API_TOKEN:
+# Spawned worker processes import this module too and must not start a bot
+if __name__ == "__main__" and DISCORD_API_TOKEN:
+    require_embeddings()
     client.run(DISCORD_API_TOKEN)
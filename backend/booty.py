@@ -0,0 +1,118 @@
+import re
+import typing
+
+# Numbers may use "," "_" or "'" as thousands separators, a decimal part and a
+# "k", "m" or "b" suffix, for instance "766,000", "766k" or "1.2m". A comma
+# followed by exactly three digits is a separator, so items need ", " between
+NUMBER = r"(?:\d{1,3}(?:[,_']\d{3})+(?!\d)|\d+)(?:\.\d+)?(?:[kmb](?![a-z]))?"
+TOKENS = re.compile(
+    rf"(?P<number>{NUMBER})|(?P<comma>,)|(?P<text>[^\d,]+)", re.IGNORECASE
+)
+# A whole well-formed item, anything between the profit and "," is filler
+ITEM = re.compile(
+    rf"\s*(?P<amount>(?>{NUMBER}))(?P<commodity>[^\d,]*?[^\d,\s][^\d,]*?)"
+    rf"(?P<profit>(?>{NUMBER}))[^\d,]*(?:,|$)",
+    re.IGNORECASE,
+)
+SUFFIXES = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+
+
+class BootyItem(typing.NamedTuple):
+    amount: int
+    commodity: str
+    profit: int
+
+
+class BootySyntaxError(Exception):
+    def __init__(self, message: str, booty: str, position: int):
+        super().__init__(f"{message} at position {position + 1}")
+        self.message = message
+        self.booty = booty
+        self.position = position
+
+    def pointer(self) -> str:
+        return f"{self.booty}\n{' ' * self.position}^"
+
+
+def parse_number(token: str) -> int:
+    if token.isdigit():
+        return int(token)
+    multiplier = SUFFIXES.get(token[-1].lower(), 1)
+    if multiplier > 1:
+        token = token[:-1]
+    return round(float(re.sub(r"[,_']", "", token)) * multiplier)
+
+
+def incomplete(item: list[typing.Any], booty: str, position: int) -> BootySyntaxError:
+    return BootySyntaxError(
+        "Expected a commodity and sell price"
+        if len(item) == 1
+        else "Expected a sell price",
+        booty,
+        position,
+    )
+
+
+def parse_booty(booty: str) -> list[BootyItem]:
+    items: list[BootyItem] = []
+    position = 0
+    while match := ITEM.match(booty, position):
+        amount, commodity, profit = match.groups()
+        items.append(
+            BootyItem(
+                parse_number(amount),
+                " ".join(commodity.split()),
+                parse_number(profit),
+            )
+        )
+        position = match.end()
+    if items and not booty[position:].strip(" \t\n,"):
+        return items
+
+    # Not well-formed, walk the tokens to find where it goes wrong
+    return parse_booty_tokens(booty)
+
+
+def parse_booty_tokens(booty: str) -> list[BootyItem]:
+    items: list[BootyItem] = []
+    # Amount, commodity and profit of the item being parsed
+    item: list[typing.Any] = []
+    for token in TOKENS.finditer(booty):
+        kind, value, position = token.lastgroup, token.group(), token.start()
+        if kind == "text":
+            if not value.strip():
+                continue
+            if not item:
+                raise BootySyntaxError(
+                    "Expected an amount",
+                    booty,
+                    position + len(value) - len(value.lstrip()),
+                )
+            if len(item) == 1:
+                item.append(" ".join(value.split()))
+            # Anything after the profit, like "aUEC", is filler
+        elif kind == "number":
+            if len(item) == 1:
+                raise BootySyntaxError(
+                    "Expected a commodity after the amount", booty, position
+                )
+            if len(item) == 3:
+                raise BootySyntaxError(
+                    'Expected "," before the next booty item', booty, position
+                )
+            item.append(parse_number(value))
+        elif len(item) == 3:
+            items.append(BootyItem(*item))
+            item = []
+        elif item:
+            raise incomplete(item, booty, position)
+        elif not items:
+            raise BootySyntaxError("Expected an amount", booty, position)
+
+    if len(item) == 3:
+        items.append(BootyItem(*item))
+    elif item:
+        raise incomplete(item, booty, len(booty))
+    if not items:
+        raise BootySyntaxError("Expected at least one booty item", booty, 0)
+    return items
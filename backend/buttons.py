@@ -43,6 +43,49 @@ class UpdateAllButton(discord.ui.Button):
             )
 
 
+class UpdateRolesButton(discord.ui.Button):
+    def __init__(
+        self,
+        role_changes: list[
+            tuple[discord.Member, list[discord.Role], list[discord.Role]]
+        ],
+        label: str,
+        style: discord.ButtonStyle,
+    ):
+        self.role_changes = role_changes
+        super().__init__(label=label, style=style)
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        assert isinstance(interaction.guild, discord.Guild)
+
+        await interaction.response.send_message(
+            f"Updating roles for {len(self.role_changes)} members...",
+            ephemeral=True,
+            delete_after=MESSAGE_TIMEOUT,
+        )
+        msg = await interaction.original_response()
+        skipped = 0
+        for i, (member, add, remove) in enumerate(self.role_changes):
+            await msg.edit(content=f"Updated {i}/{len(self.role_changes)} members...")
+            try:
+                if remove:
+                    await member.remove_roles(*remove, reason="RSI org rank sync")
+                if add:
+                    await member.add_roles(*add, reason="RSI org rank sync")
+            except discord.errors.Forbidden as e:
+                logger.warning(f'Cannot change roles for "{member}": {e}')
+                skipped += 1
+
+        if not skipped:
+            await msg.edit(
+                content=f"✅ Updated roles for all {len(self.role_changes)} members"
+            )
+        else:
+            await msg.edit(
+                content=f"❌ Updated roles for {len(self.role_changes) - skipped}/{len(self.role_changes)} members due to permission error - remember bots can only manage roles below their own highest role"
+            )
+
+
 class AskAllButton(discord.ui.Button):
     def __init__(
         self,
@@ -70,7 +70,7 @@ class Profile(pydantic.BaseModel):
     image_url: str
     citizen_record_id: str
     main_org: Organisation | MinOrganisation | None
-    enlisted: datetime.datetime
+    enlisted: datetime.datetime | None
     location: str | None
     fluency: str | None
 
@@ -0,0 +1,192 @@
+import asyncio
+import collections
+import datetime
+import re
+import threading
+
+import pydantic
+from commodity_embeddings import commodity_embeddings
+from constants import (COMMODITIES, COMMODITY_ALIASES, COMMODITY_FILLER,
+                       COMMODITY_MIN_CONFIDENCE, COMMODITY_MIN_MARGIN)
+from pymongo.asynchronous.collection import AsyncCollection
+
+
+class CommodityMatch(pydantic.BaseModel):
+    query: str
+    commodity: str
+    confidence: float
+    runner_up: str | None = None
+    runner_up_confidence: float = 0.0
+    semantic: bool = False
+
+    def ambiguous(self) -> bool:
+        return (
+            self.confidence < COMMODITY_MIN_CONFIDENCE
+            or self.confidence - self.runner_up_confidence < COMMODITY_MIN_MARGIN
+        )
+
+
+def normalize(text: str) -> str:
+    tokens = re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    return " ".join(t for t in tokens if t not in COMMODITY_FILLER)
+
+
+def trigrams(text: str) -> frozenset[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def dice(a: frozenset[str], b: frozenset[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+def edit_distance(a: str, b: str) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        left = i
+        for j, cb in enumerate(b):
+            substitute = previous[j] if ca == cb else previous[j] + 1
+            left = min(left + 1, previous[j + 1] + 1, substitute)
+            current.append(left)
+        previous = current
+    return previous[-1]
+
+
+def edit_similarity(a: str, b: str) -> float:
+    return 1 - edit_distance(a, b) / max(len(a), len(b), 1)
+
+
+# Normalized commodity names and aliases -> (commodity, trigrams)
+COMMODITY_KEYS: dict[str, tuple[str, frozenset[str]]] = {
+    normalize(key): (commodity, trigrams(normalize(key)))
+    for key, commodity in [(c, c) for c in COMMODITIES]
+    + list(COMMODITY_ALIASES.items())
+}
+
+
+def match_commodity(text: str, candidates: int = 3) -> CommodityMatch:
+    query = normalize(text)
+    if query in COMMODITY_KEYS:
+        return CommodityMatch(
+            query=text, commodity=COMMODITY_KEYS[query][0], confidence=1.0
+        )
+
+    # Trigram overlap is cheap, so only the closest few keys get an edit distance
+    query_trigrams = trigrams(query)
+    closest = sorted(
+        COMMODITY_KEYS.items(),
+        key=lambda item: dice(query_trigrams, item[1][1]),
+        reverse=True,
+    )[:candidates]
+
+    scores: dict[str, float] = {}
+    for key, (commodity, key_trigrams) in closest:
+        score = (dice(query_trigrams, key_trigrams) + edit_similarity(query, key)) / 2
+        if query and set(query.split()) <= set(key.split()):
+            # Whole words of a longer name, "medical" for "Medical Supplies"
+            score = max(score, 0.5 + len(query) / len(key) / 2)
+        scores[commodity] = max(scores.get(commodity, 0.0), score)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return CommodityMatch(
+        query=text,
+        commodity=ranked[0][0],
+        confidence=round(ranked[0][1], 3),
+        runner_up=ranked[1][0] if len(ranked) > 1 else None,
+        runner_up_confidence=round(ranked[1][1], 3) if len(ranked) > 1 else 0.0,
+    )
+
+
+def resolve_commodities(texts: list[str]) -> list[CommodityMatch]:
+    matches = [match_commodity(t) for t in texts]
+    uncertain = [i for i, m in enumerate(matches) if m.ambiguous()]
+    embeddings = commodity_embeddings() if uncertain else None
+    if not embeddings:
+        return matches
+
+    # One embedding batch for every uncertain item of the donation
+    semantic = embeddings.match([normalize(texts[i]) or texts[i] for i in uncertain])
+    for i, (commodity, similarity) in zip(uncertain, semantic):
+        lexical = (
+            (matches[i].commodity, matches[i].confidence)
+            if commodity != matches[i].commodity
+            else (matches[i].runner_up, matches[i].runner_up_confidence)
+        )
+        matches[i] = CommodityMatch(
+            query=texts[i],
+            commodity=commodity,
+            confidence=round(similarity, 3),
+            runner_up=lexical[0],
+            runner_up_confidence=lexical[1],
+            semantic=True,
+        )
+    return matches
+
+
+class CommodityResolver:
+    # Bounded LRU of normalized booty text -> match in front of the matchers,
+    # backed by corrections confirmed by admins and stored in Mongo
+    def __init__(self, corrections: AsyncCollection, size: int):
+        self.corrections = corrections
+        self.size = size
+        self._memo: collections.OrderedDict[
+            str, CommodityMatch
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, key: str, match: CommodityMatch) -> None:
+        with self._lock:
+            self._memo[key] = match
+            self._memo.move_to_end(key)
+            if len(self._memo) > self.size:
+                self._memo.popitem(last=False)
+
+    async def resolve(self, texts: list[str]) -> list[CommodityMatch]:
+        keys = [normalize(t) for t in texts]
+        resolved: dict[str, CommodityMatch] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    resolved[key] = self._memo[key]
+
+        missing = list({k: t for k, t in zip(keys, texts) if k not in resolved}.items())
+        if missing:
+            async for c in self.corrections.find(
+                {"_id": {"$in": [k for k, _ in missing]}}
+            ):
+                resolved[c["_id"]] = CommodityMatch(
+                    query=c["_id"], commodity=c["commodity"], confidence=1.0
+                )
+            missing = [(k, t) for k, t in missing if k not in resolved]
+            # Matching is CPU bound and may load the embedding model
+            matches = await asyncio.to_thread(
+                resolve_commodities, [t for _, t in missing]
+            )
+            for (key, _), match in zip(missing, matches):
+                resolved[key] = match
+            for key, match in resolved.items():
+                self.remember(key, match)
+
+        return [
+            resolved[k].model_copy(update={"query": t}) for k, t in zip(keys, texts)
+        ]
+
+    async def correct(self, text: str, commodity: str, admin: int) -> str:
+        key = normalize(text)
+        await self.corrections.replace_one(
+            {"_id": key},
+            {
+                "commodity": commodity,
+                "admin": admin,
+                "time": datetime.datetime.utcnow(),
+            },
+            upsert=True,
+        )
+        self.remember(
+            key, CommodityMatch(query=text, commodity=commodity, confidence=1.0)
+        )
+        return key
@@ -0,0 +1,82 @@
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+
+import numpy
+import numpy.typing
+from constants import COMMODITIES, COMMODITY_EMBEDDING_MODEL, EMBEDDINGS_DIR
+from loguru import logger
+
+
+def embeddings_path(model_name: str, commodities: list[str]) -> str:
+    name = re.sub(r"[^\w.-]", "_", model_name)
+    digest = hashlib.sha256("\n".join(commodities).encode()).hexdigest()[:16]
+    return str(EMBEDDINGS_DIR / f"{name}-{digest}.npy")
+
+
+class CommodityEmbeddings:
+    # Unit length commodity embeddings, computed once per model and commodity
+    # list and stored on disk so restarts only need to load the matrix
+    def __init__(self, model_name: str, commodities: list[str]):
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        self.commodities = commodities
+        self.model = SentenceTransformer(model_name)
+
+        path = embeddings_path(model_name, commodities)
+        try:
+            self.matrix: numpy.typing.NDArray[numpy.float32] = numpy.load(path)
+            logger.info(f'Loaded commodity embeddings from "{path}"')
+        except FileNotFoundError:
+            self.matrix = self.encode(commodities)
+            EMBEDDINGS_DIR.mkdir(exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                numpy.save(f, self.matrix)
+            os.replace(path + ".tmp", path)
+            logger.info(f'Saved commodity embeddings to "{path}"')
+
+    def encode(self, texts: list[str]) -> numpy.typing.NDArray[numpy.float32]:
+        return numpy.asarray(
+            self.model.encode(texts, normalize_embeddings=True), dtype=numpy.float32
+        )
+
+    def match(self, texts: list[str]) -> list[tuple[str, float]]:
+        scores = self.matrix @ self.encode(texts).T
+        best = numpy.argmax(scores, axis=0)
+        return [(self.commodities[b], float(scores[b, i])) for i, b in enumerate(best)]
+
+
+def require_embeddings() -> None:
+    # A model set without the package would only log a load error once the
+    # bot is up and quietly fall back to lexical matching
+    if (
+        COMMODITY_EMBEDDING_MODEL
+        and importlib.util.find_spec("sentence_transformers") is None
+    ):
+        raise RuntimeError(
+            f'COMMODITY_EMBEDDING_MODEL is set to "{COMMODITY_EMBEDDING_MODEL}" but sentence-transformers is not installed, install requirements-embeddings.in (or build the image with EMBEDDINGS=true)'
+        )
+
+
+# Model name -> loaded embeddings, None when the model could not be loaded
+EMBEDDINGS_CACHE: dict[str, CommodityEmbeddings | None] = {}
+EMBEDDINGS_LOCK = threading.Lock()
+
+
+def commodity_embeddings(
+    model_name: str | None = COMMODITY_EMBEDDING_MODEL,
+) -> CommodityEmbeddings | None:
+    if not model_name:
+        return None
+    with EMBEDDINGS_LOCK:
+        if model_name not in EMBEDDINGS_CACHE:
+            try:
+                EMBEDDINGS_CACHE[model_name] = CommodityEmbeddings(
+                    model_name, COMMODITIES
+                )
+            except Exception as e:
+                logger.error(f'Could not load embedding model "{model_name}": {e}')
+                EMBEDDINGS_CACHE[model_name] = None
+        return EMBEDDINGS_CACHE[model_name]
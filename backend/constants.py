@@ -1,3 +1,4 @@
+import datetime
 import json
 import os
 import pathlib
@@ -13,9 +14,31 @@ PREFIX = "/"
 DISCORD_API_TOKEN: str | None = os.environ.get("DISCORD_API_TOKEN", None)
 ELEVENLABS_API_KEY: str | None = os.environ.get("ELEVENLABS_API_KEY", None)
 RSI_BASE_URL = "https://robertsspaceindustries.com/citizens/"
+RSI_ORG_MEMBERS_URL = "https://robertsspaceindustries.com/api/orgs/getOrgMembers"
+HTML_PARSER = os.environ.get("HTML_PARSER", default="lxml")
 MONGODB_DOMAIN = os.environ.get("MONGODB_DOMAIN", default="localhost")
+MONGODB_MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", default=32))
+MONGODB_MIN_POOL_SIZE = 4
 TRANSFER_FEE = 0.005
 
+# RSI request scheduling
+RSI_REQUESTS_PER_SECOND = float(os.environ.get("RSI_REQUESTS_PER_SECOND", default=2))
+RSI_REQUEST_BURST = 5
+RSI_REQUEST_TIMEOUT = 30
+RSI_MAX_RETRIES = 4
+RSI_RETRY_BASE_DELAY = 1.0
+RSI_MAX_RETRY_DELAY = 30.0
+PROFILE_WORKERS = 8
+PROFILE_MAX_AGE = datetime.timedelta(hours=6)
+PROFILE_REFRESH_MINUTES = 10
+PROFILE_REFRESH_BATCH = 50
+PROFILE_RETRY_BASE_DELAY = datetime.timedelta(minutes=10)
+ROSTER_PAGE_SIZE = 32
+ROSTER_MAX_AGE = datetime.timedelta(minutes=30)
+PROGRESS_INTERVAL = 2
+MARKDOWN_CACHE_SIZE = 256
+EMBED_CACHE_SIZE = 512
+
 # Command descriptions
 PROFILE_DESCRIPTION = "Add/update your linked RSI profile"
 WHOIS_DESCRIPTION = "Looks up the RSI profile linked to a specific discord member"
@@ -110,6 +133,50 @@ COMMODITIES = [
     "Zeta-Prolanide",
 ]
 
+# Lower-case shorthands used in booty -> commodity
+COMMODITY_ALIASES = {
+    "acryliplex": "AcryliPlex Composite",
+    "agri supplies": "Agricultural Supplies",
+    "ag supplies": "Agricultural Supplies",
+    "altrucia": "Altruciatoxin",
+    "aluminium": "Aluminum",
+    "dilu": "Diluthermex",
+    "etam": "E'tam",
+    "food": "Processed Food",
+    "hepha": "Hephaestanite",
+    "hephae": "Hephaestanite",
+    "lara": "Laranite",
+    "laranite": "Laranite",
+    "med supplies": "Medical Supplies",
+    "meds": "Medical Supplies",
+    "pollen": "Revenant Tree Pollen",
+    "quanta": "Quantainium",
+    "quant": "Quantainium",
+    "quantanium": "Quantainium",
+    "recycled material": "RMC (Recycled Material Composite)",
+    "red envelope": "Red Festival Envelope",
+    "revenant pollen": "Revenant Tree Pollen",
+    "rmc": "RMC (Recycled Material Composite)",
+    "spirits": "Distilled Spirits",
+    "widow": "WiDoW",
+    "zeta": "Zeta-Prolanide",
+}
+
+# Units and filler words allowed around the commodity in booty
+COMMODITY_FILLER = {"auec", "for", "of", "ore", "raw", "refined", "scu", "uec", "x"}
+COMMODITY_MIN_CONFIDENCE = 0.6
+COMMODITY_MIN_MARGIN = 0.1
+COMMODITY_MEMO_SIZE = 1024
+
+# Semantic fallback for uncertain commodity matches, for instance
+# "sentence-transformers/all-MiniLM-L6-v2". Needs the optional
+# requirements-embeddings.in, the bot refuses to start without it
+COMMODITY_EMBEDDING_MODEL = os.environ.get("COMMODITY_EMBEDDING_MODEL")
+EMBEDDINGS_DIR = pathlib.Path("embeddings")
+
+# Points the running-total chart is downsampled to
+DONATION_CHART_POINTS = 500
+
 Ship = typing.Literal[
     "Aegis Hammerhead",
     "Aegis Reclaimer",
@@ -0,0 +1,24 @@
+import pymongo
+from pymongo.asynchronous.database import AsyncDatabase
+
+
+class Mongo:
+    # The async client of the bot and the API. Creating it does no I/O, its
+    # owner connects it on startup and closes it on shutdown so the pool lives
+    # and dies with the running loop
+    def __init__(self, host: str, port: int, max_pool_size: int, min_pool_size: int):
+        self.client: pymongo.AsyncMongoClient = pymongo.AsyncMongoClient(
+            host,
+            port,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+        )
+
+    async def start(self) -> None:
+        await self.client.aconnect()
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def __getitem__(self, name: str) -> AsyncDatabase:
+        return self.client[name]
@@ -0,0 +1,138 @@
+import asyncio
+import concurrent.futures
+import concurrent.futures.process
+import io
+import multiprocessing
+import threading
+
+import numpy
+from constants import DONATION_CHART_POINTS
+from pymongo.asynchronous.database import AsyncDatabase
+from readable_number import ReadableNumber  # type: ignore
+
+CHART_FILENAME = "donations.png"
+
+
+def pretty_number(number: float, precision: int = 2) -> str:
+    return str(ReadableNumber(number, use_shortform=True, precision=precision))
+
+
+def load_matplotlib() -> None:
+    import matplotlib
+
+    # Charts are only ever rendered to buffers, never to a window
+    matplotlib.use("Agg")
+    import matplotlib.figure
+
+
+async def donation_columns(db: AsyncDatabase) -> tuple[numpy.ndarray, numpy.ndarray]:
+    # Only the time and total profit of each donation leave Mongo
+    cursor = await db["donations"].aggregate(
+        [
+            {"$sort": {"_id": 1}},
+            {"$project": {"profit": {"$sum": "$booty.profit"}}},
+        ]
+    )
+    donations = await cursor.to_list()
+    times = numpy.array([d["_id"] for d in donations], dtype="datetime64[ms]")
+    profits = numpy.fromiter(
+        (d["profit"] for d in donations), dtype=float, count=len(donations)
+    )
+    return times, profits
+
+
+def lttb(x: numpy.ndarray, y: numpy.ndarray, points: int) -> numpy.ndarray:
+    # Largest-Triangle-Three-Buckets, returns the indices of the points kept.
+    # The first and last points are kept and every bucket in between keeps the
+    # point spanning the largest triangle with the previously kept point and
+    # the average of the next bucket
+    if points < 3 or len(x) <= points:
+        return numpy.arange(len(x))
+    edges = numpy.append(numpy.linspace(1, len(x) - 1, points - 1).astype(int), len(x))
+    kept = numpy.empty(points, dtype=int)
+    kept[0], kept[-1] = 0, len(x) - 1
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_x = x[end : edges[i + 2]].mean()
+        next_y = y[end : edges[i + 2]].mean()
+        a = kept[i]
+        area = numpy.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        kept[i + 1] = start + int(area.argmax())
+    return kept
+
+
+def running_totals(
+    times: numpy.ndarray, profits: numpy.ndarray, raw: bool = False
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    totals = numpy.cumsum(profits)
+    if raw:
+        return times, totals
+    kept = lttb(times.astype(numpy.int64).astype(float), totals, DONATION_CHART_POINTS)
+    return times[kept], totals[kept]
+
+
+def render_chart(times: numpy.ndarray, totals: numpy.ndarray) -> bytes:
+    load_matplotlib()
+    from matplotlib.figure import Figure
+
+    # A bare Figure instead of pyplot, nothing is kept alive between renders
+    fig = Figure()
+    ax = fig.subplots()
+    ax.plot(times, totals, "r")
+    ax.get_yaxis().set_major_formatter(lambda d, _: pretty_number(d))
+    fig.autofmt_xdate()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+class ChartRenderer:
+    # Renders in a worker process and keeps the latest chart per guild, raw or
+    # downsampled, until the donation version of that guild changes
+    def __init__(self) -> None:
+        self._pool: concurrent.futures.ProcessPoolExecutor | None = None
+        self._cache: dict[tuple[str, bool], tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned, forking the bot would copy locks held by its
+                # other threads into the worker
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=1, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def warm(self) -> None:
+        self.pool().submit(load_matplotlib).result()
+
+    def cached(self, key: tuple[str, bool], version: int) -> bytes | None:
+        hit = self._cache.get(key)
+        return hit[1] if hit and hit[0] == version else None
+
+    async def render(self, db: AsyncDatabase, version: int, raw: bool = False) -> bytes:
+        key = (db.name, raw)
+        if (png := self.cached(key, version)) is not None:
+            return png
+
+        times, profits = await donation_columns(db)
+        times, totals = await asyncio.to_thread(running_totals, times, profits, raw)
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(
+                self.pool(), render_chart, times, totals
+            )
+        except concurrent.futures.process.BrokenProcessPool:
+            # The worker died, start a fresh one on the next render
+            with self._lock:
+                self._pool = None
+            raise
+        self._cache[key] = (version, png)
+        return png
+
+
+DONATION_CHARTS = ChartRenderer()
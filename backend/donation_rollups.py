@@ -0,0 +1,238 @@
+import datetime
+import typing
+
+import pydantic
+import pymongo
+import pymongo.errors
+from pymongo.asynchronous.database import AsyncDatabase
+
+# Rollup documents in a guild's "donation_rollups" collection:
+# - "total": all-time total, count, profit share per member, total per ship,
+#   a version bumped by every write and a log of the latest writes. The log
+#   entry of each write is pushed with its version bump, so the last entry
+#   always belongs to the current version and versions number the changes
+# - "hour:<iso>", "day:<iso>", "month:<iso>": total and count per bucket, the
+#   ids sort chronologically so ranges are plain _id range scans
+BUCKETS = {
+    "hour": "%Y-%m-%dT%H",
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+CHANGE_LOG_SIZE = 100
+
+
+class Window(pydantic.BaseModel):
+    total: float = 0.0
+    count: int = 0
+
+
+class DonationSummary(pydantic.BaseModel):
+    total: Window
+    last_24_hours: Window
+    last_7_days: Window
+    yesterday: Window
+    this_month: Window
+    last_month: Window
+    this_year: Window
+    last_year: Window
+    members: dict[int, float]
+    ships: dict[str, float]
+    version: int = 0
+
+
+class LoggedChange(pydantic.BaseModel):
+    operation: typing.Literal["insert", "delete"]
+    time: datetime.datetime
+
+
+class RollupState(pydantic.BaseModel):
+    version: int = 0
+    changes: list[LoggedChange] = []
+
+    def changes_since(self, version: int) -> list[tuple[int, LoggedChange]] | None:
+        # Changes after a version with their own versions, None when the log
+        # does not reach back that far
+        missed = self.version - version
+        if missed <= 0:
+            return []
+        if missed > len(self.changes):
+            return None
+        return list(enumerate(self.changes[-missed:], version + 1))
+
+
+def total_profit(donation: dict) -> float:
+    return float(sum(d["profit"] for d in donation["booty"]))
+
+
+def bucket_id(kind: str, time: datetime.datetime) -> str:
+    if time.tzinfo:
+        time = time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return f"{kind}:{time.strftime(BUCKETS[kind])}"
+
+
+def rollup_increments(donation: dict, sign: int = 1) -> dict[str, dict[str, float]]:
+    profit = sign * total_profit(donation)
+    share = profit / len(donation["collectors"])
+    # The version changes with every write, so caches of derived data can
+    # tell when they are stale
+    total: dict[str, float] = {"total": profit, "count": sign, "version": 1}
+    for collector in donation["collectors"]:
+        total[f"members.{collector}"] = total.get(f"members.{collector}", 0) + share
+    if "ship" in donation:
+        total[f"ships.{donation['ship']['name']}"] = profit
+
+    increments = {"total": total}
+    for kind in BUCKETS:
+        increments[bucket_id(kind, donation["_id"])] = {"total": profit, "count": sign}
+    return increments
+
+
+def rollup_updates(donation: dict, sign: int = 1) -> list[pymongo.UpdateOne]:
+    updates = []
+    for _id, increment in rollup_increments(donation, sign).items():
+        update: dict[str, dict] = {"$inc": increment}
+        if _id == "total":
+            change = {
+                "operation": "insert" if sign > 0 else "delete",
+                "time": donation["_id"],
+            }
+            update["$push"] = {
+                "changes": {"$each": [change], "$slice": -CHANGE_LOG_SIZE}
+            }
+        updates.append(pymongo.UpdateOne({"_id": _id}, update, upsert=True))
+    return updates
+
+
+def add_increment(document: dict, increment: dict[str, float]) -> None:
+    # In memory what $inc does, dotted keys like "members.<id>" are nested
+    for key, value in increment.items():
+        *path, field = key.split(".")
+        parent = document
+        for name in path:
+            parent = parent.setdefault(name, {})
+        parent[field] = parent.get(field, 0) + value
+
+
+# Rollups of guilds without any are built by build_rollups before the bot
+# takes commands, so both only ever apply their own donation
+async def add_donation(db: AsyncDatabase, donation: dict) -> None:
+    await db["donation_rollups"].bulk_write(rollup_updates(donation))
+
+
+async def remove_donation(db: AsyncDatabase, donation: dict) -> None:
+    await db["donation_rollups"].bulk_write(rollup_updates(donation, -1))
+
+
+async def build_rollups(db: AsyncDatabase) -> bool:
+    # Guilds with donations from before the rollups get them built once. The
+    # buckets are replaced rather than incremented, so a build cut short is
+    # redone from scratch, and the total goes in last to mark the guild built.
+    # A concurrent build (another instance) loses on the duplicate key
+    if await db["donation_rollups"].find_one({"_id": "total"}, {"_id": 1}):
+        return False
+    documents: dict[str, dict] = {"total": {"total": 0.0, "count": 0, "version": 0}}
+    async for donation in db["donations"].find():
+        for _id, increment in rollup_increments(donation).items():
+            add_increment(documents.setdefault(_id, {}), increment)
+    total = documents.pop("total")
+    if documents:
+        await db["donation_rollups"].bulk_write(
+            [
+                pymongo.ReplaceOne({"_id": k}, v, upsert=True)
+                for k, v in documents.items()
+            ]
+        )
+    try:
+        await db["donation_rollups"].insert_one({"_id": "total", **total})
+    except pymongo.errors.DuplicateKeyError:
+        return False
+    return True
+
+
+async def donation_version(db: AsyncDatabase) -> int:
+    total = await db["donation_rollups"].find_one({"_id": "total"}, {"version": 1})
+    return total.get("version", 0) if total else 0
+
+
+async def rollup_state(db: AsyncDatabase) -> RollupState:
+    total = await db["donation_rollups"].find_one(
+        {"_id": "total"}, {"version": 1, "changes": 1}
+    )
+    return RollupState(**total) if total else RollupState()
+
+
+def bucket_filter(
+    kind: str,
+    start: datetime.datetime | None = None,
+    end: datetime.datetime | None = None,
+) -> dict:
+    return {
+        "_id": {
+            "$gte": bucket_id(kind, start) if start else f"{kind}:",
+            "$lt": bucket_id(kind, end) if end else f"{kind};",
+        }
+    }
+
+
+def summary_windows(now: datetime.datetime) -> dict[str, dict]:
+    # Hours are only counted when they started inside the window
+    hour = datetime.timedelta(hours=1)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    this_month = today.replace(day=1)
+    last_month = (this_month - datetime.timedelta(days=1)).replace(day=1)
+    this_year = this_month.replace(month=1)
+    last_year = this_year.replace(year=this_year.year - 1)
+    return {
+        "last_24_hours": bucket_filter("hour", now - 23 * hour),
+        "last_7_days": bucket_filter("hour", now - datetime.timedelta(days=7) + hour),
+        "yesterday": bucket_filter("day", today - datetime.timedelta(days=1), today),
+        "this_month": bucket_filter("month", this_month),
+        "last_month": bucket_filter("month", last_month, this_month),
+        "this_year": bucket_filter("month", this_year),
+        "last_year": bucket_filter("month", last_year, this_year),
+    }
+
+
+def summary_pipeline(now: datetime.datetime) -> list[dict]:
+    windows = summary_windows(now)
+    facets: dict[str, list[dict]] = {
+        "total": [{"$match": {"_id": "total"}}, {"$project": {"_id": 0}}]
+    }
+    for name, bucket in windows.items():
+        facets[name] = [
+            {"$match": bucket},
+            {
+                "$group": {
+                    "_id": None,
+                    "total": {"$sum": "$total"},
+                    "count": {"$sum": "$count"},
+                }
+            },
+        ]
+    # The leading $match is an _id index scan over the few hundred buckets the
+    # windows cover, the facets then only see those
+    return [
+        {"$match": {"$or": [{"_id": "total"}, *windows.values()]}},
+        {"$facet": facets},
+    ]
+
+
+async def donation_summary(
+    db: AsyncDatabase, now: datetime.datetime
+) -> DonationSummary:
+    cursor = await db["donation_rollups"].aggregate(summary_pipeline(now))
+    facets = await anext(cursor)
+    windows = {
+        name: Window(**result[0]) if result else Window()
+        for name, result in facets.items()
+        if name != "total"
+    }
+    total = facets["total"][0] if facets["total"] else {}
+    return DonationSummary(
+        total=Window(total=total.get("total", 0.0), count=total.get("count", 0)),
+        # Float $incs leave residues like 1e-12 once donations are deleted
+        members={int(k): v for k, v in total.get("members", {}).items() if round(v, 2)},
+        ships={k: v for k, v in total.get("ships", {}).items() if round(v, 2)},
+        version=total.get("version", 0),
+        **windows,
+    )
@@ -1,76 +1,254 @@
-import discord
-from bs4 import BeautifulSoup, Tag
+import collections
+import hashlib
+import re
+import threading
+import typing
+
+import pydantic
+import soupsieve
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer, Tag
 from classes import DiscordMarkdownConverter, ParsingException
+from constants import HTML_PARSER, MARKDOWN_CACHE_SIZE
+from loguru import logger
 
 
-def find_or_except(
-    soup: BeautifulSoup | Tag, key: str | None, value: str, desc: str
-) -> Tag:
-    if key:
-        res = soup.find(attrs={key: value})
-    else:
-        res = soup.find(value)
-    if not isinstance(res, Tag):
-        raise ParsingException(
-            f'Could not find {key if key else ""} "{value}" on "{desc}"'
-        )
-    return res
-
-
-def find_child_or_except(
-    soup: BeautifulSoup | Tag,
-    value: str,
-    index: int,
-    desc: str,
-    recursive: bool = False,
-) -> Tag:
-    res = soup.findChildren(value, recursive=recursive)
-    if len(res) < index + 1:
-        raise ParsingException(
-            f'Expected at least {index+1} children on "{value}" on "{desc}" but found {len(res)}'
+def resolve_parser(preferred: str) -> str:
+    try:
+        BeautifulSoup("", preferred)
+        return preferred
+    except FeatureNotFound:
+        logger.warning(f'HTML parser "{preferred}" not installed, using "html.parser"')
+        return "html.parser"
+
+
+PARSER = resolve_parser(HTML_PARSER)
+
+
+class RegionStrainer(SoupStrainer):
+    # Keeps every element matching any of the given ids, classes or tag names
+    # (including everything inside them) and drops the rest of the document.
+    # Since the kept elements stay in document order, "find" on the restricted
+    # soup returns the same element as on the full document.
+    def __init__(
+        self,
+        ids: typing.Collection[str] = (),
+        classes: typing.Collection[str] = (),
+        names: typing.Collection[str] = (),
+    ):
+        super().__init__()
+        self.ids = set(ids)
+        self.classes = set(classes)
+        self.names = set(names)
+
+    def matches(self, name: str, attrs: typing.Mapping | None) -> bool:
+        attrs = attrs or {}
+        tag_classes = attrs.get("class") or []
+        if isinstance(tag_classes, str):
+            tag_classes = tag_classes.split()
+        return (
+            name in self.names
+            or attrs.get("id") in self.ids
+            or not self.classes.isdisjoint(tag_classes)
         )
-    res_i = res[index]
-    if not isinstance(res_i, Tag):
-        raise ParsingException(f'Could not find child {index} on "{value}" on "{desc}"')
-    return res_i
-
-
-def key_or_except(
-    soup: BeautifulSoup | Tag,
-    err: str,
-    key: str = "src",
-    link: bool = True,
-    join: str = "",
-) -> str:
-    value = soup[key]
-    if isinstance(value, list):
-        value = join.join(value)
-    if not isinstance(value, str):
-        raise ParsingException(f'Could not get "{key}" on "{err}"')
-    if link and not value.startswith("http"):
-        value = "https://robertsspaceindustries.com" + value
-    return value
+
+    # bs4 < 4.13
+    def search_tag(
+        self, markup_name: typing.Any = None, markup_attrs: typing.Any = {}
+    ) -> typing.Any:
+        if isinstance(markup_name, Tag):
+            return (
+                markup_name
+                if self.matches(markup_name.name, markup_name.attrs)
+                else None
+            )
+        return markup_name if self.matches(markup_name, markup_attrs) else None
+
+    # bs4 >= 4.13
+    def allow_tag_creation(
+        self, nsprefix: str | None, name: str, attrs: typing.Any
+    ) -> bool:
+        return self.matches(name, attrs)
+
+
+PROFILE_REGION = RegionStrainer(ids=["public-profile"])
+ORGS_REGION = RegionStrainer(classes=["main", "affiliation"])
+ORG_REGION = RegionStrainer(
+    ids=["tab-history"],
+    classes=["logo", "body", "tags", "primary", "secondary"],
+    names=["h1"],
+)
+
+
+def make_soup(markup: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    return BeautifulSoup(markup, PARSER, parse_only=parse_only)
+
+
+def compound_key(css: str) -> tuple[str | None, str | None, set[str], bool]:
+    compound = re.split(r"\s*[\s>+~]\s*", css.strip())[-1]
+    tag_name = re.match(r"[\w-]+", compound)
+    tag_id = re.search(r"#([\w-]+)", compound)
+    return (
+        tag_name.group() if tag_name else None,
+        tag_id.group(1) if tag_id else None,
+        set(re.findall(r"\.([\w-]+)", compound)),
+        compound == css.strip() and not re.search(r"[:\[,]", css),
+    )
+
+
+class Selector(pydantic.BaseModel):
+    css: str
+    # Only match inside the element found by another (earlier) field
+    scope: str | None = None
+    # Use the n'th match in document order instead of the first
+    index: int = 0
+    many: bool = False
+    optional: bool = False
+    # What to extract: the tag itself, an attribute or (default) its text
+    tag: bool = False
+    attr: str | None = None
+    link: bool = False
+
+
+class Schema:
+    def __init__(self, fields: dict[str, Selector]):
+        for name, field in fields.items():
+            if field.scope and (
+                field.scope not in list(fields)[: list(fields).index(name)]
+                or fields[field.scope].many
+            ):
+                raise ValueError(f'Invalid scope "{field.scope}" on "{name}"')
+        self.fields = fields
+        self.patterns = {k: soupsieve.compile(f.css) for k, f in fields.items()}
+        self.keys = {k: compound_key(f.css) for k, f in fields.items()}
+
+    def match(self, name: str, el: Tag) -> bool:
+        # Cheap test on the rightmost compound selector before handing the
+        # element to soupsieve (skipped entirely for simple selectors)
+        tag_name, tag_id, classes, exact = self.keys[name]
+        if tag_name and el.name != tag_name:
+            return False
+        if tag_id and el.get("id") != tag_id:
+            return False
+        if classes and not classes.issubset(el.get("class") or ()):
+            return False
+        return exact or bool(self.patterns[name].match(el))
+
+    def value(self, field: Selector, tag: Tag) -> typing.Any:
+        if field.tag:
+            return tag
+        if not field.attr:
+            return tag.text.strip()
+
+        value = tag.get(field.attr)
+        if isinstance(value, list):
+            value = "".join(value)
+        if not isinstance(value, str):
+            return None
+        if field.link and not value.startswith("http"):
+            value = "https://robertsspaceindustries.com" + value
+        return value
+
+    def extract(self, root: Tag, desc: str) -> dict[str, typing.Any]:
+        found: dict[str, Tag] = {}
+        matches: dict[str, list[Tag]] = {
+            k: [] for k, f in self.fields.items() if f.many
+        }
+        seen = {k: 0 for k in self.fields}
+        pending = [k for k, f in self.fields.items() if not f.many]
+
+        # Walk the tree once, testing every field that is still missing
+        for el in root.descendants:
+            if not pending and not matches:
+                break
+            if not isinstance(el, Tag):
+                continue
+
+            ancestors: set[int] | None = None
+            for k in pending + list(matches):
+                field = self.fields[k]
+                if field.scope and field.scope not in found:
+                    continue
+                if not self.match(k, el):
+                    continue
+                if field.scope:
+                    if ancestors is None:
+                        ancestors = {id(p) for p in el.parents}
+                    if id(found[field.scope]) not in ancestors:
+                        continue
+                if field.many:
+                    matches[k].append(el)
+                elif seen[k] == field.index:
+                    found[k] = el
+                    pending.remove(k)
+                else:
+                    seen[k] += 1
+
+        res: dict[str, typing.Any] = {}
+        missing = []
+        for k, field in self.fields.items():
+            if field.many:
+                res[k] = [self.value(field, t) for t in matches[k]]
+                if None in res[k] or (not res[k] and not field.optional):
+                    missing.append(k)
+            else:
+                res[k] = self.value(field, found[k]) if k in found else None
+                if res[k] is None and not field.optional:
+                    missing.append(k)
+
+        if missing:
+            raise ParsingException(f'Could not find {", ".join(missing)} on "{desc}"')
+        return res
+
+
+THUMBNAIL_SCHEMA = Schema(
+    {
+        "thumb": Selector(css=".thumb", tag=True),
+        "src": Selector(css=".thumb > img", scope="thumb", attr="src", link=True),
+    }
+)
 
 
 def extract_thumbnail_src(tag: Tag, err: str) -> str:
-    thumb_tag = find_or_except(tag, "class", "thumb", err)
-    image = find_child_or_except(thumb_tag, "img", 0, "thumb")["src"]
-    if not isinstance(image, str):
-        raise ParsingException(f'Could not get src from "thumb" img in "{err}"')
-    if not image.startswith("http"):
-        image = "https://robertsspaceindustries.com" + image
-    return image
+    src: str = THUMBNAIL_SCHEMA.extract(tag, err)["src"]
+    return src
+
+
+# Runs of 3+ newlines, 69+ dashes and any underscore/backslash stretch long
+# enough to hold 69 underscores or 69 escaped underscores
+MARKDOWN_RUNS = re.compile(r"\n{3,}|-{69,}|[\\_]{69,}")
+LONG_UNDERSCORES = re.compile(r"_{69,}")
+LONG_ESCAPED_UNDERSCORES = re.compile(r"(?:\\_){69,}")
+
+MARKDOWN_CACHE: collections.OrderedDict[str, str] = collections.OrderedDict()
+MARKDOWN_CACHE_LOCK = threading.Lock()
+
+
+def shorten_run(match: re.Match[str]) -> str:
+    run = match.group()
+    if run[0] == "\n":
+        return "\n\n"
+    if run[0] == "-":
+        return "-" * 68
+    # Underscores are shortened before escaped underscores, as a plain run may
+    # start with the underscore of a preceding "\_"
+    run = LONG_UNDERSCORES.sub("_" * 68, run)
+    return LONG_ESCAPED_UNDERSCORES.sub(lambda _: "\\_" * 68, run)
+
+
+def normalize_markdown(md: str) -> str:
+    return MARKDOWN_RUNS.sub(shorten_run, md).strip()
 
 
 def soup_to_discord_markdown(soup: Tag) -> str:
-    md = str(DiscordMarkdownConverter().convert_soup(soup))
-    while "\n\n\n" in md:
-        md = md.replace("\n\n\n", "\n\n")
-    while ("-" * 69) in md:
-        md = md.replace("-" * 69, "-" * 68)
-    while ("_" * 69) in md:
-        md = md.replace("_" * 69, "_" * 68)
-    while ("\_" * 69) in md:
-        md = md.replace("\_" * 69, "\_" * 68)
-
-    return md.strip()
+    key = hashlib.sha256(str(soup).encode()).hexdigest()
+    with MARKDOWN_CACHE_LOCK:
+        if key in MARKDOWN_CACHE:
+            MARKDOWN_CACHE.move_to_end(key)
+            return MARKDOWN_CACHE[key]
+
+    md = normalize_markdown(str(DiscordMarkdownConverter().convert_soup(soup)))
+    with MARKDOWN_CACHE_LOCK:
+        MARKDOWN_CACHE[key] = md
+        if len(MARKDOWN_CACHE) > MARKDOWN_CACHE_SIZE:
+            MARKDOWN_CACHE.popitem(last=False)
+    return md
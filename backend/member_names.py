@@ -0,0 +1,80 @@
+import datetime
+import typing
+
+import pymongo
+from pymongo.asynchronous.database import AsyncDatabase
+
+# A guild's "member_names" collection maps member ids to their current account
+# username, donations keep the names their collectors had when they were made.
+# Usernames, not guild nicks, so they match what the API gets from Discord for
+# collectors it does not know. Writes that change names bump a version in the
+# guild's config, for caches of responses built from them
+
+
+# discord.Member, without importing discord so the API can use this module
+class Member(typing.Protocol):
+    @property
+    def id(self) -> int:
+        ...
+
+    @property
+    def name(self) -> str:
+        ...
+
+
+async def names_version(db: AsyncDatabase) -> int:
+    config = await db["config"].find_one({"_id": "member_names"}, {"version": 1})
+    return config.get("version", 0) if config else 0
+
+
+async def bump_names_version(db: AsyncDatabase) -> None:
+    await db["config"].update_one(
+        {"_id": "member_names"}, {"$inc": {"version": 1}}, upsert=True
+    )
+
+
+async def remember_members(db: AsyncDatabase, members: typing.Iterable[Member]) -> None:
+    members = list(members)
+    known = await member_names(db, [m.id for m in members])
+    now = datetime.datetime.utcnow()
+    updates = [
+        pymongo.UpdateOne(
+            {"_id": m.id}, {"$set": {"name": m.name, "time": now}}, upsert=True
+        )
+        for m in members
+    ]
+    if updates:
+        await db["member_names"].bulk_write(updates, ordered=False)
+    if any(known.get(m.id) != m.name for m in members):
+        await bump_names_version(db)
+
+
+async def member_names(db: AsyncDatabase, ids: list[int]) -> dict[int, str]:
+    return {
+        m["_id"]: m["name"]
+        async for m in db["member_names"].find({"_id": {"$in": ids}})
+    }
+
+
+async def backfill_collector_names(db: AsyncDatabase) -> int:
+    # Donations from before collector names were stored, collectors nobody
+    # knows the name of are left as None
+    donations = await (
+        db["donations"]
+        .find({"collector_names": {"$exists": False}}, {"collectors": 1})
+        .to_list()
+    )
+    names = await member_names(
+        db, list({c for d in donations for c in d["collectors"]})
+    )
+    updates = [
+        pymongo.UpdateOne(
+            {"_id": d["_id"]},
+            {"$set": {"collector_names": [names.get(c) for c in d["collectors"]]}},
+        )
+        for d in donations
+    ]
+    if updates:
+        await db["donations"].bulk_write(updates, ordered=False)
+        await bump_names_version(db)
+    return len(updates)
@@ -0,0 +1,76 @@
+import datetime
+import re
+
+from bs4 import Tag
+from classes import ParsingException, Rank
+from constants import ROSTER_MAX_AGE, ROSTER_PAGE_SIZE, RSI_ORG_MEMBERS_URL
+from html_parsing import make_soup
+from scheduler import RSI
+
+# SID -> (fetched at, lower-cased handle -> rank)
+ROSTER_CACHE: dict[str, tuple[datetime.datetime, dict[str, Rank]]] = {}
+
+
+def parse_roster_page(html: str, sid: str) -> dict[str, Rank]:
+    index: dict[str, Rank] = {}
+    soup = make_soup(html)
+    for item in soup.find_all("li", attrs={"class": "member-item"}):
+        nick = item.find(attrs={"class": "nick"})
+        if not isinstance(nick, Tag) or not nick.text.strip():
+            # Redacted and hidden members do not expose their handle
+            continue
+
+        rank = item.find(attrs={"class": "rank"})
+        stars = item.find(attrs={"class": "stars"})
+        if not isinstance(rank, Tag) or not isinstance(stars, Tag):
+            raise ParsingException(
+                f'Could not find rank of "{nick.text.strip()}" on "{sid}" roster'
+            )
+        width = re.search(r"width:\s*(\d+)", str(stars.get("style", "")))
+        index[nick.text.strip().lower()] = Rank(
+            rank=round(int(width.group(1)) / 20) if width else 0,
+            name=rank.text.strip(),
+        )
+    return index
+
+
+def fetch_roster(sid: str) -> dict[str, Rank]:
+    index: dict[str, Rank] = {}
+    page = 1
+    while True:
+        r = RSI.post(
+            RSI_ORG_MEMBERS_URL,
+            json={
+                "symbol": sid,
+                "search": "",
+                "pagesize": ROSTER_PAGE_SIZE,
+                "page": page,
+            },
+        )
+        data = r.json() if r.is_success else {}
+        if not data.get("success") or "data" not in data:
+            raise ParsingException(
+                f'Could not get members of "{sid}" (status {r.status_code})'
+            )
+
+        html = data["data"].get("html") or ""
+        index.update(parse_roster_page(html, sid))
+        if not html.strip() or page * ROSTER_PAGE_SIZE >= int(
+            data["data"].get("totalrows", 0)
+        ):
+            return index
+        page += 1
+
+
+def roster_index(
+    sid: str, max_age: datetime.timedelta = ROSTER_MAX_AGE
+) -> dict[str, Rank]:
+    sid = sid.upper()
+    if sid in ROSTER_CACHE:
+        fetched, index = ROSTER_CACHE[sid]
+        if datetime.datetime.utcnow() - fetched < max_age:
+            return index
+
+    index = fetch_roster(sid)
+    ROSTER_CACHE[sid] = (datetime.datetime.utcnow(), index)
+    return index
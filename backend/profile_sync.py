@@ -0,0 +1,151 @@
+import datetime
+import enum
+import hashlib
+import urllib
+
+import pydantic
+from classes import MinOrganisation, Organisation, ParsingException, Profile
+from constants import PROFILE_MAX_AGE, PROFILE_RETRY_BASE_DELAY, RSI_BASE_URL
+from rsi_profile import extract_profile_info
+
+
+class ProfileChange(enum.Enum):
+    Handle = "handle"
+    Disappeared = "disappeared"
+    LostOrg = "lost org"
+    Org = "org"
+    Rank = "rank"
+
+
+class ProfileCheck(pydantic.BaseModel):
+    member_id: int
+    url: str
+    cached: bool = False
+    missing: bool = False
+    error: str | None = None
+    update: dict = {}
+    changes: list[tuple[ProfileChange, str | None, str | None]] = []
+
+    def change_records(self) -> list[dict]:
+        return [
+            {
+                "member": self.member_id,
+                "change": change.value,
+                "old": old,
+                "new": new,
+                "time": self.update["checked"],
+            }
+            for change, old, new in self.changes
+        ]
+
+
+def main_org_key(profile: Profile) -> str | None:
+    if isinstance(profile.main_org, Organisation):
+        return profile.main_org.sid
+    if isinstance(profile.main_org, MinOrganisation):
+        return profile.main_org.name
+    return None
+
+
+def main_org_rank(profile: Profile) -> str | None:
+    if isinstance(profile.main_org, Organisation) and profile.main_org.rank:
+        return f"{profile.main_org.rank.name} ({profile.main_org.rank.rank}/5)"
+    return None
+
+
+def profile_hash(profile: Profile) -> str:
+    return hashlib.sha256(
+        profile.model_dump_json(exclude={"enlisted"}).encode()
+    ).hexdigest()
+
+
+def profile_snapshot(profile: Profile) -> dict:
+    return {
+        "handle": profile.handle,
+        "org": main_org_key(profile),
+        "rank": main_org_rank(profile),
+        "hash": profile_hash(profile),
+        "missing": False,
+        "checked": datetime.datetime.utcnow(),
+    }
+
+
+def is_fresh(db_profile: dict, max_age: datetime.timedelta) -> bool:
+    return (
+        "checked" in db_profile
+        and datetime.datetime.utcnow() - db_profile["checked"] < max_age
+    )
+
+
+def succeeded(checked: datetime.datetime) -> dict:
+    return {"failures": 0, "retry": checked + PROFILE_MAX_AGE}
+
+
+def failed(check: ProfileCheck, db_profile: dict, error: str) -> ProfileCheck:
+    # Failed profiles are retried with exponential backoff instead of staying
+    # the oldest ones and crowding everyone else out of the refresh batches
+    failures = db_profile.get("failures", 0) + 1
+    check.error = error
+    check.update = {
+        "failures": failures,
+        "retry": datetime.datetime.utcnow()
+        + min(PROFILE_RETRY_BASE_DELAY * 2 ** (failures - 1), PROFILE_MAX_AGE),
+    }
+    return check
+
+
+def check_profile(
+    db_profile: dict, max_age: datetime.timedelta | None = None
+) -> ProfileCheck:
+    check = ProfileCheck(member_id=db_profile["_id"], url=db_profile["url"])
+    if max_age and is_fresh(db_profile, max_age):
+        check.cached = True
+        check.missing = db_profile.get("missing", False)
+        return check
+
+    try:
+        profile = extract_profile_info(db_profile["url"])
+    except ParsingException as e:
+        return failed(check, db_profile, str(e))
+
+    old_handle = db_profile.get("handle", db_profile["nick"])
+    if profile == 404:
+        check.missing = True
+        checked = datetime.datetime.utcnow()
+        check.update = {"missing": True, "checked": checked} | succeeded(checked)
+        if not db_profile.get("missing"):
+            check.changes.append((ProfileChange.Disappeared, old_handle, None))
+        return check
+    if not isinstance(profile, Profile):
+        return failed(check, db_profile, f"Could not get profile (status {profile})")
+
+    snapshot = profile_snapshot(profile)
+    if snapshot["hash"] == db_profile.get("hash") and not db_profile.get("missing"):
+        check.update = {"checked": snapshot["checked"]} | succeeded(snapshot["checked"])
+        return check
+
+    # Only write the fields that actually differ from the stored snapshot
+    check.update = {k: v for k, v in snapshot.items() if db_profile.get(k) != v}
+    check.update["checked"] = snapshot["checked"]
+    check.update |= succeeded(snapshot["checked"])
+
+    if profile.handle != old_handle:
+        check.changes.append((ProfileChange.Handle, old_handle, profile.handle))
+        check.update["nick"] = profile.handle
+        check.update["url"] = RSI_BASE_URL + urllib.parse.quote(profile.handle)
+
+    if "checked" in db_profile:
+        old_org = db_profile.get("org")
+        if old_org != snapshot["org"]:
+            check.changes.append(
+                (
+                    ProfileChange.LostOrg if not snapshot["org"] else ProfileChange.Org,
+                    old_org,
+                    snapshot["org"],
+                )
+            )
+        elif db_profile.get("rank") != snapshot["rank"]:
+            check.changes.append(
+                (ProfileChange.Rank, db_profile.get("rank"), snapshot["rank"])
+            )
+    return check
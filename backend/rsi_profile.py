@@ -1,175 +1,164 @@
+import collections
 import datetime
+import threading
+import typing
 import urllib
+import weakref
 
 import discord
-import httpx
 import loguru
-from bs4 import BeautifulSoup, Tag
+import pydantic
+from bs4 import Tag
 from classes import (Activity, Badge, MinOrganisation, Organisation,
                      OrganisationTag, ParsingException, Profile, Rank)
 from constants import *
+from html_parsing import (ORG_REGION, ORGS_REGION, PROFILE_REGION, Schema,
+                          Selector, make_soup, soup_to_discord_markdown)
+from scheduler import RSI
 
 DESC_TOO_LONG = "...\n\n`[DESCRIPTION TOO LONG]`\n"
 DESC_MAX_LEN = 4096 - len(DESC_TOO_LONG)
 
-import discord
-from bs4 import BeautifulSoup, Tag
-from classes import DiscordMarkdownConverter, ParsingException
-
-
-def find_or_except(
-    soup: BeautifulSoup | Tag, key: str | None, value: str, desc: str
-) -> Tag:
-    if key:
-        res = soup.find(attrs={key: value})
-    else:
-        res = soup.find(value)
-    if not isinstance(res, Tag):
-        raise ParsingException(
-            f'Could not find {key if key else ""} "{value}" on "{desc}"'
-        )
-    return res
-
-
-def find_child_or_except(
-    soup: BeautifulSoup | Tag,
-    value: str,
-    index: int,
-    desc: str,
-    recursive: bool = False,
-) -> Tag:
-    res = soup.findChildren(value, recursive=recursive)
-    if len(res) < index + 1:
-        raise ParsingException(
-            f'Expected at least {index+1} children on "{value}" on "{desc}" but found {len(res)}'
-        )
-    res_i = res[index]
-    if not isinstance(res_i, Tag):
-        raise ParsingException(f'Could not find child {index} on "{value}" on "{desc}"')
-    return res_i
-
-
-def key_or_except(
-    soup: BeautifulSoup | Tag,
-    err: str,
-    key: str = "src",
-    link: bool = True,
-    join: str = "",
-) -> str:
-    value = soup[key]
-    if isinstance(value, list):
-        value = join.join(value)
-    if not isinstance(value, str):
-        raise ParsingException(f'Could not get "{key}" on "{err}"')
-    if link and not value.startswith("http"):
-        value = "https://robertsspaceindustries.com" + value
-    return value
-
-
-def extract_thumbnail_src(tag: Tag, err: str) -> str:
-    thumb_tag = find_or_except(tag, "class", "thumb", err)
-    image = find_child_or_except(thumb_tag, "img", 0, "thumb")["src"]
-    if not isinstance(image, str):
-        raise ParsingException(f'Could not get src from "thumb" img in "{err}"')
-    if not image.startswith("http"):
-        image = "https://robertsspaceindustries.com" + image
-    return image
-
-
-def soup_to_discord_markdown(soup: Tag) -> str:
-    md = str(DiscordMarkdownConverter().convert_soup(soup))
-    while "\n\n\n" in md:
-        md = md.replace("\n\n\n", "\n\n")
-    while ("-" * 69) in md:
-        md = md.replace("-" * 69, "-" * 68)
-    while ("_" * 69) in md:
-        md = md.replace("_" * 69, "_" * 68)
-    while ("\_" * 69) in md:
-        md = md.replace("\_" * 69, "\_" * 68)
+ORG_SCHEMA = Schema(
+    {
+        "logo": Selector(css=".logo", tag=True),
+        "icon_url": Selector(css="img", scope="logo", attr="src", link=True),
+        "body": Selector(css=".body", tag=True),
+        "tab_history": Selector(css="#tab-history", tag=True),
+        "history": Selector(css="#tab-history > div", scope="tab_history", tag=True),
+        "tags": Selector(css=".tags", tag=True),
+        "tag_names": Selector(
+            css="li", scope="tags", attr="class", many=True, optional=True
+        ),
+        "tag_values": Selector(css="li", scope="tags", many=True, optional=True),
+        "primary": Selector(css=".primary", tag=True),
+        "primary_name": Selector(css="img", scope="primary", attr="alt"),
+        "primary_url": Selector(css="img", scope="primary", attr="src", link=True),
+        "secondary": Selector(css=".secondary", tag=True),
+        "secondary_name": Selector(css="img", scope="secondary", attr="alt"),
+        "secondary_url": Selector(css="img", scope="secondary", attr="src", link=True),
+        "h1": Selector(css="h1"),
+        "sid": Selector(css="h1 > span", scope="h1"),
+    }
+)
+
+ORGS_SCHEMA = Schema(
+    {
+        "main": Selector(css=".main", tag=True),
+        "left_col": Selector(css=".left-col", scope="main", tag=True),
+        "affiliation": Selector(css=".affiliation", tag=True, optional=True),
+    }
+)
+
+ORG_INFO_SCHEMA = Schema(
+    {
+        "thumb": Selector(css=".thumb", tag=True, optional=True),
+        "url": Selector(css="a", scope="thumb", attr="href", link=True, optional=True),
+        "icon_url": Selector(
+            css="img", scope="thumb", attr="src", link=True, optional=True
+        ),
+        "info": Selector(css=".info", tag=True, optional=True),
+        "rank_name": Selector(css="strong", scope="info", index=1, optional=True),
+        "ranking": Selector(css=".ranking", tag=True, optional=True),
+        "stars": Selector(
+            css=".ranking > .active",
+            scope="ranking",
+            tag=True,
+            many=True,
+            optional=True,
+        ),
+    }
+)
+
+PROFILE_SCHEMA = Schema(
+    {
+        "public_profile": Selector(css="#public-profile", tag=True),
+        "info": Selector(css=".info", scope="public_profile", tag=True),
+        "handle": Selector(css=".info > p:nth-of-type(2) strong", scope="info"),
+        "badge_icon_url": Selector(
+            css=".info > p:nth-of-type(3) img", scope="info", attr="src", link=True
+        ),
+        "badge": Selector(
+            css=".info > p:nth-of-type(3) > span:nth-of-type(2)", scope="info"
+        ),
+        "thumb": Selector(css=".thumb", scope="public_profile", tag=True),
+        "image_url": Selector(css=".thumb > img", scope="thumb", attr="src", link=True),
+        "citizen_record": Selector(
+            css=".citizen-record", scope="public_profile", tag=True
+        ),
+        "citizen_record_id": Selector(
+            css=".citizen-record > strong", scope="citizen_record"
+        ),
+        "main_org": Selector(css=".main-org", scope="public_profile", tag=True),
+        "bio_tag": Selector(
+            css=".bio", scope="public_profile", tag=True, optional=True
+        ),
+        "bio": Selector(css="div", scope="bio_tag", optional=True),
+        "left_cols": Selector(
+            css=".left-col", scope="public_profile", tag=True, many=True
+        ),
+        "entries": Selector(
+            css=".left-col .entry",
+            scope="public_profile",
+            tag=True,
+            many=True,
+            optional=True,
+        ),
+    }
+)
 
-    return md.strip()
+ENTRY_SCHEMA = Schema(
+    {
+        "label": Selector(css=".label"),
+        "value": Selector(css=".value", tag=True),
+    }
+)
 
 
 def url_to_org(url: str, rank: Rank | None) -> Organisation | None:
-    r = httpx.get(url)
+    r = RSI.get(url)
     if not r.is_success:
         return None
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    img = find_or_except(
-        find_or_except(soup, "class", "logo", url), None, "img", f"logo {url}"
-    )
-
-    body = soup_to_discord_markdown(find_or_except(soup, "class", "body", url))
-
-    history = soup_to_discord_markdown(
-        find_child_or_except(
-            find_or_except(soup, "id", "tab-history", url), "div", 0, url
-        )
-    )
-
-    tags = [
-        OrganisationTag(
-            name=key_or_except(c, f"li {url}", key="class", link=False).capitalize(),
-            value=c.text.strip(),
-        )
-        for c in find_or_except(soup, "class", "tags", url).find_all("li")
-    ]
-    primary_activity_tag = find_or_except(
-        find_or_except(soup, "class", "primary", url), None, "img", f"primary {url}"
-    )
-    primary_activity_name = key_or_except(
-        primary_activity_tag, f"img primary {url}", key="alt", link=False
-    )
-    primary_activity = Activity(
-        name=primary_activity_name,
-        url=key_or_except(primary_activity_tag, f"img primary {url}"),
-    )
-    secondary_activity_tag = find_or_except(
-        find_or_except(soup, "class", "secondary", url), None, "img", f"secondary {url}"
-    )
-    secondary_activity_name = key_or_except(
-        secondary_activity_tag, f"img secondary {url}", key="alt", link=False
-    )
-    secondary_activity = Activity(
-        name=secondary_activity_name,
-        url=key_or_except(secondary_activity_tag, f"img secondary {url}"),
-    )
-
-    h1 = find_or_except(soup, None, "h1", f"h1 {url}")
 
+    org = ORG_SCHEMA.extract(make_soup(r.text, ORG_REGION), url)
     return Organisation(
-        name=h1.text.rsplit("/", 1)[0].strip(),
-        body=body,
-        history=history,
-        tags=tags,
-        sid=find_child_or_except(h1, "span", 0, f"span h1 {url}").text.strip(),
+        name=org["h1"].rsplit("/", 1)[0].strip(),
+        body=soup_to_discord_markdown(org["body"]),
+        history=soup_to_discord_markdown(org["history"]),
+        tags=[
+            OrganisationTag(name=name.capitalize(), value=value)
+            for name, value in zip(org["tag_names"], org["tag_values"])
+        ],
+        sid=org["sid"],
         rank=rank,
-        icon_url=key_or_except(img, f"img {url}"),
+        icon_url=org["icon_url"],
         url=url,
-        primary_activity=primary_activity,
-        secondary_activity=secondary_activity,
+        primary_activity=Activity(name=org["primary_name"], url=org["primary_url"]),
+        secondary_activity=Activity(
+            name=org["secondary_name"], url=org["secondary_url"]
+        ),
     )
 
 
 def orgs_lookup(url: str) -> int | list[Organisation] | MinOrganisation:
-    r = httpx.get(url + "/organizations")
+    r = RSI.get(url + "/organizations")
 
     if not r.is_success:
         return r.status_code
 
-    soup = BeautifulSoup(r.text, "html.parser")
+    orgs = ORGS_SCHEMA.extract(make_soup(r.text, ORGS_REGION), "page")
 
-    main_org_tag = find_or_except(soup, "class", "main", "page")
-    left_col_tag = find_or_except(main_org_tag, "class", "left-col", "main org")
-
-    main_org = extract_org_info(left_col_tag, "main org")
+    main_org = extract_org_info(orgs["left_col"], "main org")
     try:
-        affiliation_orgs = [
-            extract_org_info(c, "main org")
-            for c in find_or_except(soup, "class", "affiliation", "page").children
-            if isinstance(c, Tag)
-        ]
+        affiliation_orgs = (
+            [
+                extract_org_info(c, "main org")
+                for c in orgs["affiliation"].children
+                if isinstance(c, Tag)
+            ]
+            if orgs["affiliation"]
+            else []
+        )
     except ParsingException as e:
         affiliation_orgs = []
 
@@ -181,7 +170,7 @@ def orgs_lookup(url: str) -> int | list[Organisation] | MinOrganisation:
 
 def extract_profile_info(url: str) -> int | Profile:
     try:
-        r = httpx.get(url)
+        r = RSI.get(url)
     except Exception as e:
         loguru.logger.error(f'Could not get user profile at "{url}": {e}')
         return -1
@@ -189,84 +178,35 @@ def extract_profile_info(url: str) -> int | Profile:
     if not r.is_success:
         return r.status_code
 
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    public_profile = find_or_except(soup, "id", "public-profile", "page")
-
-    # Extract user "Handle name"
-    info_tag = find_or_except(public_profile, "class", "info", "public-profile")
-    handle_parent_tag = find_child_or_except(info_tag, "p", 1, "info")
-    handle = find_or_except(
-        handle_parent_tag, None, "strong", "handle parent"
-    ).text.strip()
-
-    # Extract user badge
-    badge_parent_tag = find_child_or_except(info_tag, "p", 2, "info")
-    badge_icon_url = key_or_except(
-        find_or_except(badge_parent_tag, None, "img", "info badge img"),
-        "info badge img",
-    )
-    badge_text = find_child_or_except(
-        badge_parent_tag, "span", 1, "info badge text"
-    ).text.strip()
-
-    # Extract profile image
-    image_url = extract_thumbnail_src(public_profile, "public-profile")
-
-    # Extract "UEE Citizen Record" id
-    citizen_record_id = find_child_or_except(
-        find_or_except(public_profile, "class", "citizen-record", "public-profile"),
-        "strong",
-        0,
-        "citizen-record",
-    ).text.strip()
-
-    # Extract main org
-    main_org = extract_org_info(
-        find_or_except(public_profile, "class", "main-org", "public-profile"),
-        "main-org",
-    )
+    profile = PROFILE_SCHEMA.extract(make_soup(r.text, PROFILE_REGION), "page")
 
-    # Extract bio
-    bio_tag = public_profile.find(attrs={"class": "bio"})
-    bio = ""
-    if isinstance(bio_tag, Tag):
-        bio_body_tag = bio_tag.find("div")
-        if isinstance(bio_body_tag, Tag):
-            bio = bio_body_tag.text.strip()
-
-    # Extract enlisted, localtion, fluency
-    left_col = public_profile.find_all(attrs={"class": "left-col"})[-1]
-    enlisted = datetime.datetime.now()
+    # Extract enlisted, localtion, fluency from the last "left-col"
+    # None when the page has no date, a stand-in like now() would make every
+    # extraction of the profile differ and miss the embed cache
+    enlisted = None
     location = None
     fluency = None
-    for i, entry in enumerate(left_col.find_all(attrs={"class": "entry"})):
-        label = find_or_except(
-            entry, "class", "label", f"entry-{i} left-col public-profile"
-        ).text.strip()
-        value = (
-            find_or_except(
-                entry, "class", "value", f"entry-{i} left-col public-profile"
-            )
-            .text.replace("\n", "")
-            .strip()
-        )
+    left_col = profile["left_cols"][-1]
+    entries = [e for e in profile["entries"] if any(p is left_col for p in e.parents)]
+    for i, entry in enumerate(entries):
+        fields = ENTRY_SCHEMA.extract(entry, f"entry-{i} left-col public-profile")
+        value = fields["value"].text.replace("\n", "").strip()
         while " ," in value:
             value = value.replace(" ,", ",")
-        if label == "Enlisted":
+        if fields["label"] == "Enlisted":
             enlisted = datetime.datetime.strptime(value, "%b %d, %Y")
-        elif label == "Location":
+        elif fields["label"] == "Location":
             location = value
-        elif label == "Fluency":
+        elif fields["label"] == "Fluency":
             fluency = value
 
     return Profile(
-        handle=handle,
-        bio=bio,
-        badge=Badge(name=badge_text, icon_url=badge_icon_url),
-        image_url=image_url,
-        citizen_record_id=citizen_record_id,
-        main_org=main_org,
+        handle=profile["handle"],
+        bio=profile["bio"] or "",
+        badge=Badge(name=profile["badge"], icon_url=profile["badge_icon_url"]),
+        image_url=profile["image_url"],
+        citizen_record_id=profile["citizen_record_id"],
+        main_org=extract_org_info(profile["main_org"], "main-org"),
         enlisted=enlisted,
         location=location,
         fluency=fluency,
@@ -274,41 +214,110 @@ def extract_profile_info(url: str) -> int | Profile:
 
 
 def extract_org_info(org_tag: Tag, err: str) -> Organisation | MinOrganisation | None:
-    try:
-        thumb = find_or_except(org_tag, "class", "thumb", err)
-    except ParsingException:
+    org = ORG_INFO_SCHEMA.extract(org_tag, err)
+    if not org["thumb"]:
         return None
 
-    try:
-        url = key_or_except(
-            find_or_except(thumb, None, "a", f"thumb {err}"),
-            f"a thumb {err}",
-            key="href",
+    if not org["url"]:
+        if not org["icon_url"]:
+            raise ParsingException(f'Could not find icon_url on "{err}"')
+        return MinOrganisation(name="[REDACTED]", icon_url=org["icon_url"])
+
+    missing = [k for k in ["info", "ranking", "rank_name"] if not org[k]]
+    if missing:
+        raise ParsingException(f'Could not find {", ".join(missing)} on "{err}"')
+    return url_to_org(org["url"], Rank(rank=len(org["stars"]), name=org["rank_name"]))
+
+
+# Discord Embed Conversion
+class CacheMetrics(pydantic.BaseModel):
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def content_key(value: object) -> typing.Hashable:
+    # Hashable copy of a model's field values, strings keep their cached hash so
+    # keying the same model again is cheap compared to dumping it to JSON
+    if isinstance(value, pydantic.BaseModel):
+        return (type(value).__name__,) + tuple(
+            content_key(v) for v in value.__dict__.values()
         )
-    except ParsingException:
-        return MinOrganisation(
-            name="[REDACTED]",
-            icon_url=key_or_except(
-                find_or_except(thumb, None, "img", f"img thumb {err}"),
-                f"img thumb {err}",
-            ),
+    if isinstance(value, list):
+        return tuple(content_key(v) for v in value)
+    return value
+
+
+class EmbedCache:
+    # Keeps the dict form of rendered embeds keyed by the content of the model
+    # they were rendered from, so showing the same profile or org again only
+    # rebuilds the embed from its serialized form
+    def __init__(self, size: int):
+        self.size = size
+        self._embeds: collections.OrderedDict[
+            typing.Hashable, dict
+        ] = collections.OrderedDict()
+        # id(model) -> (weak reference, content key), models are not mutated
+        # after extraction so the key is only computed once per instance
+        self._keys: dict[int, tuple[weakref.ref, typing.Hashable]] = {}
+        self._lock = threading.Lock()
+        self._metrics = CacheMetrics()
+
+    def key(self, model: pydantic.BaseModel) -> typing.Hashable:
+        known = self._keys.get(id(model))
+        if known and known[0]() is model:
+            return known[1]
+
+        key = content_key(model)
+        model_id = id(model)
+        self._keys[model_id] = (
+            weakref.ref(model, lambda _: self._keys.pop(model_id, None)),
+            key,
         )
+        return key
 
-    info = find_or_except(org_tag, "class", "info", err)
-    ranking = find_or_except(org_tag, "class", "ranking", f"info {err}")
-    return url_to_org(
-        url,
-        Rank(
-            rank=len(ranking.findChildren(attrs={"class": "active"}, recursive=False)),
-            name=find_child_or_except(
-                info, "strong", 1, f"info {err}", recursive=True
-            ).text.strip(),
-        ),
-    )
+    def render(
+        self,
+        model: pydantic.BaseModel,
+        build: typing.Callable[[typing.Any], discord.Embed],
+    ) -> discord.Embed:
+        with self._lock:
+            key = self.key(model)
+            cached = self._embeds.get(key)
+            if cached is not None:
+                self._embeds.move_to_end(key)
+                self._metrics.hits += 1
+                return discord.Embed.from_dict(cached)
+            self._metrics.misses += 1
+
+        embed = build(model)
+        with self._lock:
+            self._embeds[key] = dict(embed.to_dict())
+            if len(self._embeds) > self.size:
+                self._embeds.popitem(last=False)
+        return embed
+
+    def metrics(self) -> CacheMetrics:
+        with self._lock:
+            return self._metrics.model_copy(update={"size": len(self._embeds)})
+
+
+EMBED_CACHE = EmbedCache(EMBED_CACHE_SIZE)
 
 
-# Discord Embed Conversion
 def profile_to_embed(profile: Profile) -> discord.Embed:
+    return EMBED_CACHE.render(profile, render_profile_embed)
+
+
+def org_to_embed(org: Organisation) -> discord.Embed:
+    return EMBED_CACHE.render(org, render_org_embed)
+
+
+def render_profile_embed(profile: Profile) -> discord.Embed:
     embed = discord.Embed(
         title=profile.handle,
         url=RSI_BASE_URL + urllib.parse.quote(profile.handle),
@@ -317,7 +326,10 @@ def profile_to_embed(profile: Profile) -> discord.Embed:
     )
 
     embed.set_footer(
-        text=f"{profile.badge.name} │ Enlisted", icon_url=profile.badge.icon_url
+        text=f"{profile.badge.name} │ Enlisted"
+        if profile.enlisted
+        else profile.badge.name,
+        icon_url=profile.badge.icon_url,
     )
 
     embed.set_image(url=profile.image_url)
@@ -353,7 +365,7 @@ def profile_to_embed(profile: Profile) -> discord.Embed:
     return embed
 
 
-def org_to_embed(org: Organisation) -> discord.Embed:
+def render_org_embed(org: Organisation) -> discord.Embed:
     description = f"{org.body}\n# History:\n{org.history}"
     if len(description) > DESC_MAX_LEN:
         description = description[:DESC_MAX_LEN] + DESC_TOO_LONG
@@ -0,0 +1,173 @@
+import collections
+import contextlib
+import contextvars
+import enum
+import random
+import threading
+import time
+import typing
+
+import httpx
+import pydantic
+from constants import (RSI_MAX_RETRIES, RSI_MAX_RETRY_DELAY, RSI_REQUEST_BURST,
+                       RSI_REQUEST_TIMEOUT, RSI_REQUESTS_PER_SECOND,
+                       RSI_RETRY_BASE_DELAY)
+from loguru import logger
+
+
+class Lane(enum.IntEnum):
+    # Lower value wins when several lanes are waiting for a token
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class LaneMetrics(pydantic.BaseModel):
+    queued: int = 0
+    requests: int = 0
+    retries: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def avg_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+CURRENT_LANE: contextvars.ContextVar[Lane] = contextvars.ContextVar(
+    "rsi_lane", default=Lane.INTERACTIVE
+)
+
+
+@contextlib.contextmanager
+def lane(value: Lane) -> typing.Iterator[None]:
+    token = CURRENT_LANE.set(value)
+    try:
+        yield
+    finally:
+        CURRENT_LANE.reset(token)
+
+
+def is_retryable(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def retry_delay(
+    response: httpx.Response, attempt: int, base_delay: float, max_delay: float
+) -> float:
+    try:
+        delay = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        # Full jitter exponential backoff
+        delay = random.uniform(0, base_delay * 2**attempt)
+    return min(max(delay, 0.0), max_delay)
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_retries: int,
+        retry_base_delay: float,
+        max_retry_delay: float,
+        timeout: float,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.max_retry_delay = max_retry_delay
+        self.client = httpx.Client(timeout=timeout)
+
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._waiting: dict[Lane, collections.deque[object]] = {
+            l: collections.deque() for l in sorted(Lane)
+        }
+        self._metrics = {l: LaneMetrics() for l in Lane}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _next_ticket(self) -> object | None:
+        for queue in self._waiting.values():
+            if queue:
+                return queue[0]
+        return None
+
+    def acquire(self, lane: Lane) -> float:
+        ticket = object()
+        start = time.monotonic()
+        with self._cond:
+            queue = self._waiting[lane]
+            queue.append(ticket)
+            while True:
+                self._refill()
+                if self._next_ticket() is ticket and self._tokens >= 1:
+                    break
+                self._cond.wait(
+                    (1 - self._tokens) / self.rate if self._tokens < 1 else None
+                )
+            queue.popleft()
+            self._tokens -= 1
+            self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            metrics = self._metrics[lane]
+            metrics.requests += 1
+            metrics.total_wait += waited
+            metrics.max_wait = max(metrics.max_wait, waited)
+        return waited
+
+    # Blocks the calling thread while it waits, call it from a thread
+    # (asyncio.to_thread) and never from the event loop
+    def request(
+        self, method: str, url: str, lane: Lane | None = None, **kwargs: typing.Any
+    ) -> httpx.Response:
+        lane = CURRENT_LANE.get() if lane is None else lane
+        attempt = 0
+        while True:
+            self.acquire(lane)
+            response = self.client.request(method, url, **kwargs)
+            if not is_retryable(response) or attempt >= self.max_retries:
+                return response
+
+            delay = retry_delay(
+                response, attempt, self.retry_base_delay, self.max_retry_delay
+            )
+            logger.warning(
+                f'RSI responded {response.status_code} on "{url}", retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})'
+            )
+            with self._cond:
+                self._metrics[lane].retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, lane: Lane | None = None) -> httpx.Response:
+        return self.request("GET", url, lane)
+
+    def post(
+        self, url: str, json: typing.Any, lane: Lane | None = None
+    ) -> httpx.Response:
+        return self.request("POST", url, lane, json=json)
+
+    def metrics(self) -> dict[Lane, LaneMetrics]:
+        with self._cond:
+            return {
+                l: m.model_copy(update={"queued": len(self._waiting[l])})
+                for l, m in self._metrics.items()
+            }
+
+
+RSI = RequestScheduler(
+    rate=RSI_REQUESTS_PER_SECOND,
+    burst=RSI_REQUEST_BURST,
+    max_retries=RSI_MAX_RETRIES,
+    retry_base_delay=RSI_RETRY_BASE_DELAY,
+    max_retry_delay=RSI_MAX_RETRY_DELAY,
+    timeout=RSI_REQUEST_TIMEOUT,
+)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import time
+import typing
+
+from commodity_embeddings import commodity_embeddings
+from constants import COMMODITY_EMBEDDING_MODEL
+from donation_chart import DONATION_CHARTS
+from loguru import logger
+
+
+def process_age() -> float:
+    # Seconds since the interpreter started, falls back to since this import
+    try:
+        with open("/proc/self/stat") as f:
+            started = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - started / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - IMPORTED
+
+
+IMPORTED = time.monotonic()
+
+
+class Warmup:
+    # Slow to load and only needed by a few commands, loaded after on_ready
+    def __init__(self) -> None:
+        self.timings: dict[str, float] = {}
+        self.gateway_ready: float | None = None
+        self._ready: asyncio.Future[None] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def ready(self) -> asyncio.Future[None]:
+        if self._ready is None:
+            self._ready = asyncio.get_running_loop().create_future()
+        return self._ready
+
+    def timed(self, name: str, load: typing.Callable[[], object]) -> None:
+        start = time.perf_counter()
+        load()
+        self.timings[name] = time.perf_counter() - start
+
+    def load(self) -> None:
+        self.timed("chart worker", DONATION_CHARTS.warm)
+        if COMMODITY_EMBEDDING_MODEL:
+            self.timed(COMMODITY_EMBEDDING_MODEL, commodity_embeddings)
+
+    async def run(self) -> None:
+        try:
+            await asyncio.to_thread(self.load)
+            self.ready().set_result(None)
+        except Exception as e:
+            logger.error(f"Warm-up failed: {e}")
+            self.ready().set_exception(e)
+            return
+        logger.info(self.report())
+
+    def start(self) -> None:
+        if self._task is None:
+            self.gateway_ready = process_age()
+            self._task = asyncio.create_task(self.run())
+
+    async def wait(self) -> None:
+        await asyncio.shield(self.ready())
+
+    def report(self) -> str:
+        lines = [f"Gateway ready {self.gateway_ready or 0:.2f}s after start"]
+        lines += [
+            f"- {name}: {seconds:.2f}s"
+            for name, seconds in sorted(
+                self.timings.items(), key=lambda t: t[1], reverse=True
+            )
+        ]
+        lines.append(
+            f"Warm-up took {sum(self.timings.values()):.2f}s after gateway ready"
+        )
+        return "\n".join(lines)
+
+
+WARMUP = Warmup()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import pathlib
+import random
+import re
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.chdir(ROOT)  # constants loads locations.json relative to the working dir
+
+from booty import parse_booty
+from constants import COMMODITIES
+
+
+def split_booty(booty: str) -> list[tuple[int, str, int]]:
+    # The per-item parsing /donation used before booty.parse_booty, with the
+    # item stripped as re.match rejected every item after the first otherwise
+    items = []
+    for d in booty.split(","):
+        d = d.strip()
+        while "  " in d:
+            d = d.replace("  ", " ")
+        d = d.replace(",", "")
+        if not re.match(r"\d+\D+\d+", d):
+            raise ValueError(d)
+        _, tmp_amount, right = re.split(r"(\d+)", d, 1)
+        commodity, tmp_profit, _ = re.split(r"(\d+)", right, 1)
+        items.append((int(tmp_amount), commodity.strip(), int(tmp_profit)))
+    return items
+
+
+def make_booty(rng: random.Random, items: int) -> str:
+    return ", ".join(
+        f"{rng.randint(1, 999)} SCU of {rng.choice(COMMODITIES)}  for {rng.randint(1000, 9_999_999)} aUEC"
+        for _ in range(items)
+    )
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description="Booty parsing throughput")
+    argparser.add_argument("-n", type=int, default=2000)
+    args = argparser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'items':>6} {'split':>12} {'grammar':>12}")
+    for items in [1, 5, 20, 100]:
+        booties = [make_booty(rng, items) for _ in range(100)]
+        assert all(
+            split_booty(b) == [tuple(i) for i in parse_booty(b)] for b in booties
+        )
+        results = []
+        for parse in [split_booty, parse_booty]:
+            seconds = min(
+                timeit.repeat(
+                    lambda: [parse(b) for b in booties],
+                    number=max(1, args.n // 100),
+                    repeat=3,
+                )
+            )
+            results.append(len(booties) * max(1, args.n // 100) * items / seconds)
+        print(f"{items:>6} {results[0]:>8.0f} i/s {results[1]:>8.0f} i/s")
+
+
+if __name__ == "__main__":
+    main()
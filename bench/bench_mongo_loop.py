@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import os
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.chdir(ROOT)  # constants loads locations.json relative to the working dir
+
+import pymongo
+from constants import MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE
+from database import Mongo
+
+TICK = 0.005
+DB = "bench_mongo_loop"
+
+
+async def ticker(overshoots: list[float], stop: asyncio.Event) -> None:
+    # How late the loop wakes a task that asked to sleep for one tick, the
+    # delay every interaction and heartbeat of the bot sees too
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        overshoots.append(time.perf_counter() - start - TICK)
+
+
+def sync_command(db: pymongo.database.Database, i: int) -> None:
+    # What a command did before: blocking calls straight on the loop
+    db["donations"].insert_one({"_id": i, "profit": i})
+    db["donations"].find_one({"_id": i})
+    list(db["donations"].find().sort("_id", pymongo.DESCENDING).limit(20))
+
+
+async def async_command(db: Mongo, i: int) -> None:
+    await db[DB]["donations"].insert_one({"_id": i, "profit": i})
+    await db[DB]["donations"].find_one({"_id": i})
+    await db[DB]["donations"].find().sort("_id", pymongo.DESCENDING).limit(20).to_list()
+
+
+async def run(host: str, port: int, kind: str, commands: int) -> list[float]:
+    overshoots: list[float] = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(overshoots, stop))
+    if kind == "sync":
+        client: pymongo.MongoClient = pymongo.MongoClient(
+            host, port, maxPoolSize=MONGODB_MAX_POOL_SIZE
+        )
+        client.drop_database(DB)
+
+        async def command(i: int) -> None:
+            sync_command(client[DB], i)
+
+        await asyncio.gather(*map(command, range(commands)))
+        client.drop_database(DB)
+        client.close()
+    else:
+        mongo = Mongo(host, port, MONGODB_MAX_POOL_SIZE, MONGODB_MIN_POOL_SIZE)
+        await mongo.start()
+        await mongo.client.drop_database(DB)
+        await asyncio.gather(*(async_command(mongo, i) for i in range(commands)))
+        await mongo.client.drop_database(DB)
+        await mongo.close()
+    stop.set()
+    await tick_task
+    return overshoots
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(
+        description="Event loop latency while commands use sync or async Mongo"
+    )
+    argparser.add_argument("--host", default="localhost")
+    argparser.add_argument("--port", type=int, default=27017)
+    argparser.add_argument("-n", type=int, nargs="+", default=[10, 100, 1000])
+    args = argparser.parse_args()
+
+    # A blocked loop ticks rarely, "ticks" shows how often it got to run
+    print(
+        f"{'commands':>8} {'client':>6} {'seconds':>8} {'ticks':>6} {'p50':>9} {'p99':>9}"
+    )
+    for commands in args.n:
+        for kind in ["sync", "async"]:
+            start = time.perf_counter()
+            overshoots = asyncio.run(run(args.host, args.port, kind, commands))
+            seconds = time.perf_counter() - start
+            ms = sorted(o * 1000 for o in overshoots) or [0.0]
+            p99 = ms[min(len(ms) - 1, int(len(ms) * 0.99))]
+            print(
+                f"{commands:>8} {kind:>6} {seconds:>8.2f} {len(overshoots):>6} "
+                f"{statistics.median(ms):>6.2f} ms {p99:>6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
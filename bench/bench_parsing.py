@@ -0,0 +1,60 @@
+import argparse
+import os
+import pathlib
+import sys
+import timeit
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.chdir(ROOT)  # constants loads locations.json relative to the working dir
+
+from bs4 import BeautifulSoup, SoupStrainer
+from html_parsing import ORG_REGION, ORGS_REGION, PROFILE_REGION
+
+# Saved pages are matched on their file name prefix
+REGIONS: dict[str, SoupStrainer] = {
+    "profile": PROFILE_REGION,
+    "organizations": ORGS_REGION,
+    "org": ORG_REGION,
+}
+
+
+def bench(markup: str, parser: str, strainer: SoupStrainer | None, n: int) -> float:
+    return (
+        min(
+            timeit.repeat(
+                lambda: BeautifulSoup(markup, parser, parse_only=strainer),
+                number=n,
+                repeat=3,
+            )
+        )
+        / n
+    )
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(
+        description="Compare HTML parser backends on saved RSI pages"
+    )
+    argparser.add_argument(
+        "pages", type=pathlib.Path, nargs="?", default=ROOT / "bench" / "pages"
+    )
+    argparser.add_argument("-n", type=int, default=20)
+    args = argparser.parse_args()
+
+    print(f"{'page':<40} {'html.parser':>12} {'lxml':>12} {'lxml+region':>12}")
+    for page in sorted(args.pages.glob("*.html")):
+        kind = next((k for k in REGIONS if page.name.startswith(k)), None)
+        if not kind:
+            continue
+        markup = page.read_text()
+        baseline = bench(markup, "html.parser", None, args.n)
+        lxml = bench(markup, "lxml", None, args.n)
+        region = bench(markup, "lxml", REGIONS[kind], args.n)
+        print(
+            f"{page.name:<40} {baseline * 1000:>10.2f}ms {lxml * 1000:>10.2f}ms {region * 1000:>10.2f}ms ({baseline / region:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import os
+import pathlib
+import statistics
+import sys
+import time
+import timeit
+import typing
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.chdir(ROOT)  # constants loads locations.json relative to the working dir
+
+import httpx
+from constants import RSI_BASE_URL, RSI_REQUEST_TIMEOUT
+from html_parsing import (ORG_REGION, ORGS_REGION, PROFILE_REGION, make_soup,
+                          soup_to_discord_markdown)
+from org_roster import parse_roster_page
+from rsi_profile import (ORG_SCHEMA, ORGS_SCHEMA, PROFILE_SCHEMA,
+                         extract_profile_info, org_to_embed, orgs_lookup,
+                         profile_to_embed)
+from rsi_server import PAGES, serve
+from scheduler import RSI
+
+
+def parse_org(markup: str) -> None:
+    org = ORG_SCHEMA.extract(make_soup(markup, ORG_REGION), "org")
+    soup_to_discord_markdown(org["body"])
+    soup_to_discord_markdown(org["history"])
+
+
+# Page kind (file name prefix) -> the parsing done for it by the bot
+PARSERS: dict[str, typing.Callable[[str], object]] = {
+    "profile": lambda m: PROFILE_SCHEMA.extract(make_soup(m, PROFILE_REGION), "page"),
+    "organizations": lambda m: ORGS_SCHEMA.extract(make_soup(m, ORGS_REGION), "page"),
+    "org": parse_org,
+    "roster": lambda m: parse_roster_page(m, "roster"),
+}
+
+
+class StandInTransport(httpx.HTTPTransport):
+    def __init__(self, port: int):
+        super().__init__()
+        self.port = port
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme="http", host="127.0.0.1", port=self.port
+        )
+        return super().handle_request(request)
+
+
+def whois(handle: str) -> None:
+    url = RSI_BASE_URL + handle
+    profile = extract_profile_info(url)
+    if not isinstance(profile, int):
+        profile_to_embed(profile)
+    organisations = orgs_lookup(url)
+    if isinstance(organisations, list):
+        for o in organisations:
+            org_to_embed(o)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * p))]
+
+
+def bench_parsing(pages: pathlib.Path, n: int) -> None:
+    print(f"{'page':<36} {'kind':<14} {'size':>8} {'parse':>10}")
+    per_kind: dict[str, list[float]] = {}
+    for page in sorted(pages.glob("*.html")):
+        kind = next((k for k in PARSERS if page.name.startswith(k + "-")), None)
+        if not kind:
+            continue
+        markup = page.read_text()
+        parser = PARSERS[kind]
+        elapsed = min(timeit.repeat(lambda: parser(markup), number=n, repeat=3)) / n
+        per_kind.setdefault(kind, []).append(elapsed)
+        print(
+            f"{page.name:<36} {kind:<14} {len(markup) // 1024:>6}KB {elapsed * 1000:>8.2f}ms"
+        )
+
+    print()
+    for kind, samples in per_kind.items():
+        print(f"{kind:<14} mean {statistics.mean(samples) * 1000:>8.2f}ms")
+
+
+def bench_whois(pages: pathlib.Path, n: int, latency: float, rate: bool) -> None:
+    server = serve(pages=pages, latency=latency)
+    RSI.client = httpx.Client(
+        transport=StandInTransport(server.server_port), timeout=RSI_REQUEST_TIMEOUT
+    )
+    if not rate:
+        RSI.rate = RSI.burst = 10**9
+
+    handles = sorted(
+        p.name[len("profile-") : -len(".html")] for p in pages.glob("profile-*.html")
+    )
+    print(f"{'/whois':<36} {'mean':>10} {'p50':>10} {'p95':>10}")
+    for handle in handles + ["does-not-exist"]:
+        samples = []
+        for _ in range(n):
+            start = time.perf_counter()
+            whois(handle)
+            samples.append(time.perf_counter() - start)
+        print(
+            f"{handle:<36} {statistics.mean(samples) * 1000:>8.2f}ms {percentile(samples, 0.5) * 1000:>8.2f}ms {percentile(samples, 0.95) * 1000:>8.2f}ms"
+        )
+    server.shutdown()
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(
+        description="Benchmark RSI page parsing and /whois latency against a local stand-in"
+    )
+    argparser.add_argument("--pages", type=pathlib.Path, default=PAGES)
+    argparser.add_argument("-n", type=int, default=20)
+    argparser.add_argument(
+        "--latency", type=float, default=0.0, help="Added delay per response in ms"
+    )
+    argparser.add_argument(
+        "--rate",
+        action="store_true",
+        help="Keep the configured RSI request rate limit",
+    )
+    args = argparser.parse_args()
+
+    bench_parsing(args.pages, args.n)
+    print()
+    bench_whois(args.pages, args.n, args.latency / 1000, args.rate)
+
+
+if __name__ == "__main__":
+    main()
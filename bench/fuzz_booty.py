@@ -0,0 +1,84 @@
+import argparse
+import os
+import pathlib
+import random
+import sys
+import typing
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+os.chdir(ROOT)  # constants loads locations.json relative to the working dir
+
+from booty import BootyItem, BootySyntaxError, parse_booty, parse_booty_tokens
+from constants import COMMODITIES
+
+FRAGMENTS = [" ", "  ", ",", ", ", "1", "12", "766", "000", ",000", "_000", "'500"]
+FRAGMENTS += [".5", "k", "m", "b", "K", "SCU", " of ", " for ", "aUEC", "RMC"]
+FRAGMENTS += ["E'tam", "gold", "\t", "\n", "x", "-", "é"]
+
+
+def format_number(rng: random.Random, value: int) -> tuple[str, int]:
+    style = rng.randrange(5)
+    if style == 0:
+        return str(value), value
+    if style == 1:
+        return f"{value:,}".replace(",", rng.choice(",_'")), value
+    if style == 2:
+        return f"{value // 1000}k", value // 1000 * 1000
+    if style == 3:
+        return f"{value / 1_000_000:.1f}m", round(round(value / 1_000_000, 1) * 1e6)
+    decimal = f"{value}.{rng.randrange(10)}"
+    return decimal, round(float(decimal))
+
+
+def valid_booty(rng: random.Random) -> tuple[str, list[BootyItem]]:
+    parts, expected = [], []
+    for _ in range(rng.randint(1, 6)):
+        amount, amount_value = format_number(rng, rng.randint(1, 99_999))
+        profit, profit_value = format_number(rng, rng.randint(1_000, 99_999_999))
+        commodity = rng.choice(COMMODITIES)
+        filler = rng.choice(["", " aUEC", " auec", " UEC"])
+        unit = rng.choice([" ", "SCU ", " SCU of "])
+        if amount[-1].isalpha():
+            # "1kSCU" reads as the number 1 followed by "kSCU"
+            unit = " " + unit.lstrip()
+        parts.append(f"{amount}{unit}{commodity} {profit}{filler}")
+        expected.append(
+            BootyItem(
+                amount_value,
+                " ".join(f"{unit}{commodity}".split()),
+                profit_value,
+            )
+        )
+    # Without a space "1,000,500 SCU" is one number, not two booty items
+    return rng.choice([", ", " , ", ",  "]).join(parts), expected
+
+
+def outcome(parse: typing.Callable[[str], list[BootyItem]], booty: str) -> object:
+    try:
+        return parse(booty)
+    except BootySyntaxError as e:
+        assert 0 <= e.position <= len(booty), (booty, e.position)
+        return (e.message, e.position)
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description="Fuzz the booty grammar")
+    argparser.add_argument("-n", type=int, default=100_000)
+    argparser.add_argument("--seed", type=int, default=0)
+    args = argparser.parse_args()
+
+    rng = random.Random(args.seed)
+    for i in range(args.n):
+        booty, expected = valid_booty(rng)
+        assert parse_booty(booty) == expected, (booty, parse_booty(booty), expected)
+
+        # Arbitrary input must parse or fail with a position, and the fast path
+        # must agree with the token walk used for error reporting
+        noise = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 20)))
+        assert outcome(parse_booty, noise) == outcome(parse_booty_tokens, noise), noise
+    print(f"{args.n} valid and {args.n} arbitrary booty strings OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import http.server
+import json
+import pathlib
+import re
+import threading
+import time
+
+PAGES = pathlib.Path(__file__).resolve().parent / "pages"
+
+# Stand-in for robertsspaceindustries.com serving the saved pages in PAGES
+ROUTES = [
+    (re.compile(r"^/citizens/([^/]+)/organizations/?$"), "organizations-{}.html"),
+    (re.compile(r"^/citizens/([^/]+)/?$"), "profile-{}.html"),
+    (re.compile(r"^/orgs/([^/]+)/?$"), "org-{}.html"),
+]
+ROSTER_ROUTE = "/api/orgs/getOrgMembers"
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    pages: pathlib.Path = PAGES
+    latency: float = 0.0
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def send(self, status: int, body: bytes, content_type: str) -> None:
+        time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        for pattern, name in ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            page = self.pages / name.format(match.group(1).lower())
+            if page.is_file():
+                self.send(200, page.read_bytes(), "text/html; charset=utf-8")
+                return
+            break
+        self.send(404, b"<html><body>Not found</body></html>", "text/html")
+
+    def do_POST(self) -> None:
+        if self.path != ROSTER_ROUTE:
+            self.send(404, b"{}", "application/json")
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        roster = self.pages / f"roster-{str(body['symbol']).lower()}.html"
+        if not roster.is_file():
+            data: dict = {"success": 0, "code": "ErrApiThrottled"}
+        else:
+            items = roster.read_text().splitlines()
+            size, page = int(body["pagesize"]), int(body["page"])
+            data = {
+                "success": 1,
+                "data": {
+                    "totalrows": len(items),
+                    "html": "\n".join(items[(page - 1) * size : page * size]),
+                },
+            }
+        self.send(200, json.dumps(data).encode(), "application/json")
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    pages: pathlib.Path = PAGES,
+    latency: float = 0.0,
+) -> http.server.ThreadingHTTPServer:
+    handler = type("Handler", (StandInHandler,), {"pages": pages, "latency": latency})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(
+        description="Serve saved RSI pages as a local stand-in for the RSI website"
+    )
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=8080)
+    argparser.add_argument("--pages", type=pathlib.Path, default=PAGES)
+    argparser.add_argument(
+        "--latency", type=float, default=0.0, help="Added delay per response in ms"
+    )
+    args = argparser.parse_args()
+
+    server = serve(args.host, args.port, args.pages, args.latency / 1000)
+    print(f"Serving {args.pages} on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()